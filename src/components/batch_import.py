@@ -1,107 +1,45 @@
 """Batch import component for importing multiple components at once"""
 
+import uuid
+import hashlib
 import streamlit as st
-import re
-from src.models.component import Category, ChangeType
+import pandas as pd
+import json
+from src.models.component import Category, ChangeType, ImportStatus, ImportJobStatus
 from src.utils.database import db
+from src.utils.import_parser import iter_batch_import
+from src.utils.import_jobs import submit_import_job, resume_import_job, is_job_interrupted
+from src.utils.url_patterns import get_url_registry
 from src.config import VP_TYPES, EM_TYPES, DM_TYPES
 
-def parse_batch_import(text):
-    """
-    Parse batch import text and extract component information
-    
-    Format examples:
-    - [IMPORT] [FUNCTION] ACCRUE IMPORT VALIDATION https://<base>/#/visual-programming/hadiUc1Vg
-    - [accrue][creation] ui creation detail https://<base>/#/experience-manager/update/5smJ6oH4R
-    - Table name https://<base>/#/form-data/table/group123/componentId456
-    """
-    lines = text.strip().split('\n')
-    components = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Find URL in the line
-        url_pattern = r'https?://[^\s]+'
-        url_match = re.search(url_pattern, line)
-        
-        if not url_match:
-            continue
-        
-        url = url_match.group(0)
-        
-        # Extract name (everything before URL, trimmed)
-        name = line[:url_match.start()].strip()
-        if not name:
-            name = "Untitled Component"
-        
-        # Parse URL to determine category and extract component ID
-        component_data = None
-        
-        # Visual Programming pattern: /#/visual-programming/<component-id>
-        vp_match = re.search(r'/#/visual-programming/([^/\s?#]+)', url)
-        if vp_match:
-            component_id = vp_match.group(1)
-            component_data = {
-                'name': name,
-                'component_id': component_id,
-                'url_link': url,
-                'category': Category.VP,
-                'type': VP_TYPES[0],  # Default to first type (API)
-                'change_type': ChangeType.NEW,
-                'description': ''
-            }
-        
-        # Experience Manager pattern: /#/experience-manager/update/<component-id>
-        em_match = re.search(r'/#/experience-manager/update/([^/\s?#]+)', url)
-        if em_match:
-            component_id = em_match.group(1)
-            component_data = {
-                'name': name,
-                'component_id': component_id,
-                'url_link': url,
-                'category': Category.EM,
-                'type': EM_TYPES[0],  # Default to first type (Single UI)
-                'change_type': ChangeType.NEW,
-                'description': ''
-            }
-        
-        # Data Manager pattern: /#/form-data/table/<group_id>/<component-id>
-        dm_match = re.search(r'/#/form-data/table/([^/\s?#]+)/([^/\s?#]+)', url)
-        if dm_match:
-            group_id = dm_match.group(1)
-            component_id = dm_match.group(2)
-            component_data = {
-                'name': name,
-                'component_id': component_id,
-                'url_link': url,
-                'category': Category.DM,
-                'type': DM_TYPES[0],  # Default to first type (Schema)
-                'change_type': ChangeType.NEW,
-                'description': f'Group ID: {group_id}'
-            }
-        
-        if component_data:
-            components.append(component_data)
-    
-    return components
+PREVIEW_PAGE_SIZE = 100
+MAX_LISTED_ERRORS = 200
+
+# Preview column -> staging table field
+STAGED_FIELDS = {
+    'Name': 'name',
+    'Component ID': 'component_id',
+    'Type': 'type',
+    'Category': 'category',
+    'Change Type': 'change_type',
+    'Description': 'description'
+}
 
 def render_batch_import():
     """Render batch import interface"""
     st.subheader("📦 Batch Import Components")
     
-    st.markdown("""
+    formats = "\n".join(
+        f"    - {route.name}: `{route.example}`" for route in get_url_registry().routes if route.example
+    )
+    st.markdown(f"""
     **Import multiple components at once!**
     
     Paste your component list below. Each line should contain:
     - Component name (optional) followed by the URL
     
     **Supported URL formats:**
-    - Visual Programming: `https://<base>/#/visual-programming/<component-id>`
-    - Experience Manager: `https://<base>/#/experience-manager/update/<component-id>`
-    - Data Manager: `https://<base>/#/form-data/table/<group_id>/<component-id>`
+{formats}
     """)
     
     with st.form("batch_import_form"):
@@ -130,54 +68,111 @@ Table Schema https://example.com/#/form-data/table/group123/table456"""
             if not import_text.strip():
                 st.error("Please paste at least one component to import")
             else:
-                # Parse the input
-                parsed_components = parse_batch_import(import_text)
+                # Parse and stage server-side; the session only keeps the batch ID
+                parse_errors = []
+                
+                def staged_rows():
+                    for parsed in iter_batch_import(import_text):
+                        if parsed.error:
+                            parse_errors.append(f"Line {parsed.line_no}: {parsed.error}")
+                        else:
+                            yield parsed.line_no, parsed.component
                 
-                if not parsed_components:
+                if st.session_state.get('import_batch_id'):
+                    db.discard_staged_import(st.session_state.import_batch_id)
+                batch_id = str(uuid.uuid4())
+                staged_count = db.stage_import(batch_id, staged_rows())
+                
+                if parse_errors:
+                    st.warning(f"⚠️ Skipped {len(parse_errors)} line(s) that could not be parsed")
+                    with st.expander("View Skipped Lines"):
+                        st.text("\n".join(parse_errors[:MAX_LISTED_ERRORS]))
+                        if len(parse_errors) > MAX_LISTED_ERRORS:
+                            st.caption(f"... and {len(parse_errors) - MAX_LISTED_ERRORS} more")
+                
+                if not staged_count:
                     st.error("No valid components found. Please check your URL format.")
                 else:
                     # Show preview
-                    st.success(f"✅ Found {len(parsed_components)} component(s) to import")
+                    st.success(f"✅ Found {staged_count} component(s) to import")
                     
-                    # Store in session state for editing
-                    st.session_state.pending_imports = parsed_components
+                    st.session_state.import_batch_id = batch_id
+                    st.session_state.import_preview_page = 0
                     st.session_state.show_import_preview = True
 
+def _clear_import_state():
+    for key in ('import_batch_id', 'import_preview_page', 'import_preview_status',
+                'show_import_preview', 'show_import_confirmation'):
+        if key in st.session_state:
+            del st.session_state[key]
+    st.session_state.show_batch_import = False
+
 def show_import_preview():
-    """Show editable preview of components before import"""
-    if 'pending_imports' in st.session_state and st.session_state.get('show_import_preview'):
+    """Show a paged, editable preview of the staged components before import"""
+    batch_id = st.session_state.get('import_batch_id')
+    if batch_id and st.session_state.get('show_import_preview'):
         st.markdown("---")
         st.subheader("📝 Review and Edit Before Import")
         st.markdown("**💡 Tip:** Double-click any cell to edit. Add descriptions or modify details before importing.**")
         
-        # Convert to DataFrame for editing (only initialize once)
-        import pandas as pd
+        # Conflict summary against existing components
+        counts = db.count_staged_by_status(batch_id)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("New", counts.get(ImportStatus.NEW, 0))
+        col2.metric("Changed", counts.get(ImportStatus.CHANGED, 0))
+        col3.metric("Unchanged", counts.get(ImportStatus.UNCHANGED, 0))
+        col4.metric("Duplicate", counts.get(ImportStatus.DUPLICATE, 0))
+        if counts.get(ImportStatus.UNCHANGED) or counts.get(ImportStatus.DUPLICATE):
+            st.caption("Unchanged rows and repeated lines are skipped. Changed rows update the existing component.")
+        
+        status_filter = st.selectbox(
+            "Show",
+            ["All"] + [s.value for s in ImportStatus],
+            key="import_preview_status",
+            on_change=lambda: st.session_state.update(import_preview_page=0)
+        )
+        status = ImportStatus(status_filter) if status_filter != "All" else None
+        
+        page = st.session_state.get('import_preview_page', 0)
+        rows, total = db.get_staged_rows(batch_id, limit=PREVIEW_PAGE_SIZE, offset=page * PREVIEW_PAGE_SIZE,
+                                         status=status)
+        if not rows:
+            st.info("No staged rows match this filter")
         
-        if 'import_preview_df' not in st.session_state:
-            preview_data = []
-            for comp in st.session_state.pending_imports:
-                preview_data.append({
-                    'Name': comp['name'],
-                    'Component ID': comp['component_id'],
-                    'Type': comp['type'],
-                    'Category': comp['category'].value,
-                    'Change Type': comp['change_type'].value,
-                    'Description': comp['description']
-                })
-            st.session_state.import_preview_df = pd.DataFrame(preview_data)
+        df = pd.DataFrame([{
+            'Line': row.row_no,
+            'Status': row.status.value,
+            'Name': row.name,
+            'Component ID': row.component_id,
+            'Type': row.type,
+            'Category': row.category.value,
+            'Change Type': row.change_type.value,
+            'Description': row.description or '',
+            'UID': row.uid
+        } for row in rows], columns=['Line', 'Status', 'Name', 'Component ID', 'Type', 'Category',
+                                     'Change Type', 'Description', 'UID'])
         
         # Get all type options
-        from src.config import VP_TYPES, EM_TYPES, DM_TYPES
         all_types = VP_TYPES + EM_TYPES + DM_TYPES
         
-        # Editable preview with key to maintain state
+        # Editable preview of the current page only
         edited_df = st.data_editor(
-            st.session_state.import_preview_df,
+            df.drop(columns=['UID']),
             use_container_width=True,
             hide_index=True,
             num_rows="fixed",
-            key="import_data_editor",
+            disabled=["Line", "Status"],
+            # Keyed on the rows shown: an edit can move a row out of a filtered page
+            key=f"import_data_editor_{batch_id}_{hashlib.md5('|'.join(df['UID']).encode()).hexdigest()}",
             column_config={
+                "Line": st.column_config.NumberColumn(
+                    "Line",
+                    help="Line number in the pasted text"
+                ),
+                "Status": st.column_config.TextColumn(
+                    "Status",
+                    help="Compared with existing components by Component ID and Category"
+                ),
                 "Name": st.column_config.TextColumn(
                     "Name",
                     help="Component name",
@@ -199,13 +194,13 @@ def show_import_preview():
                 "Category": st.column_config.SelectboxColumn(
                     "Category",
                     help="Component category",
-                    options=["Visual Programming", "Experience Manager", "Data Manager"],
+                    options=[c.value for c in Category],
                     required=True
                 ),
                 "Change Type": st.column_config.SelectboxColumn(
                     "Change Type",
                     help="New or Updated",
-                    options=["New", "Updated"],
+                    options=[c.value for c in ChangeType],
                     required=True
                 ),
                 "Description": st.column_config.TextColumn(
@@ -216,101 +211,124 @@ def show_import_preview():
             }
         )
         
-        # Update the stored dataframe
-        st.session_state.import_preview_df = edited_df
+        # Write edits of this page back to the staging table
+        for idx, row in edited_df.iterrows():
+            original_row = df.iloc[idx]
+            update_data = {}
+            for column, field in STAGED_FIELDS.items():
+                if row[column] != original_row[column]:
+                    update_data[field] = row[column]
+            if update_data:
+                if 'category' in update_data:
+                    update_data['category'] = Category(update_data['category'])
+                if 'change_type' in update_data:
+                    update_data['change_type'] = ChangeType(update_data['change_type'])
+                if 'description' in update_data and pd.isna(update_data['description']):
+                    update_data['description'] = ''
+                db.update_staged_row(original_row['UID'], update_data)
+        
+        # Pagination
+        total_pages = (total + PREVIEW_PAGE_SIZE - 1) // PREVIEW_PAGE_SIZE
+        if total_pages > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            
+            with col1:
+                if st.button("⬅️ Previous", key="import_preview_prev", disabled=page == 0):
+                    st.session_state.import_preview_page -= 1
+                    st.rerun()
+            
+            with col2:
+                st.markdown(f"<center>Page {page + 1} of {total_pages} ({total} components)</center>", unsafe_allow_html=True)
+            
+            with col3:
+                if st.button("Next ➡️", key="import_preview_next", disabled=page >= total_pages - 1):
+                    st.session_state.import_preview_page += 1
+                    st.rerun()
+        
         st.session_state.show_import_confirmation = True
 
 def confirm_and_import():
-    """Show confirmation and execute import"""
-    if 'pending_imports' in st.session_state and st.session_state.get('show_import_confirmation'):
+    """Show confirmation and hand the staged batch to a background import job"""
+    batch_id = st.session_state.get('import_batch_id')
+    if batch_id and st.session_state.get('show_import_confirmation'):
         st.markdown("---")
         
         col1, col2, col3 = st.columns([1, 1, 4])
         
         with col1:
             if st.button("✅ Confirm Import", type="primary", use_container_width=True):
-                import pandas as pd
-                
-                # Build updated imports from the edited dataframe
-                updated_imports = []
-                edited_df = st.session_state.get('import_preview_df')
-                
-                if edited_df is not None:
-                    for idx, row in edited_df.iterrows():
-                        # Map category name to Category enum
-                        category_map = {
-                            "Visual Programming": Category.VP,
-                            "Experience Manager": Category.EM,
-                            "Data Manager": Category.DM
-                        }
-                        
-                        # Map change type to ChangeType enum
-                        change_type_map = {
-                            "New": ChangeType.NEW,
-                            "Updated": ChangeType.UPDATED
-                        }
-                        
-                        updated_imports.append({
-                            'name': row['Name'],
-                            'component_id': row['Component ID'],
-                            'url_link': st.session_state.pending_imports[idx]['url_link'],  # Preserve original URL
-                            'type': row['Type'],
-                            'category': category_map[row['Category']],
-                            'change_type': change_type_map[row['Change Type']],
-                            'description': row['Description'] if pd.notna(row['Description']) else ''
-                        })
-                else:
-                    updated_imports = st.session_state.pending_imports
-                
-                success_count = 0
-                error_count = 0
-                errors = []
-                
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                for i, comp_data in enumerate(updated_imports):
-                    try:
-                        db.create_component(comp_data)
-                        success_count += 1
-                        status_text.text(f"Importing {i+1}/{len(updated_imports)}: {comp_data['name']}")
-                    except Exception as e:
-                        error_count += 1
-                        errors.append(f"{comp_data['name']}: {str(e)}")
-                    
-                    progress_bar.progress((i + 1) / len(updated_imports))
-                
-                progress_bar.empty()
-                status_text.empty()
-                
-                # Show results
-                if success_count > 0:
-                    st.success(f"🎉 Successfully imported {success_count} component(s)!")
-                
-                if error_count > 0:
-                    st.error(f"❌ Failed to import {error_count} component(s)")
-                    with st.expander("View Errors"):
-                        for error in errors:
-                            st.text(error)
-                
-                # Clear state
-                del st.session_state.pending_imports
-                del st.session_state.show_import_confirmation
-                if 'show_import_preview' in st.session_state:
-                    del st.session_state.show_import_preview
-                if 'import_preview_df' in st.session_state:
-                    del st.session_state.import_preview_df
-                st.session_state.show_batch_import = False
-                
+                st.session_state.import_job_uids = st.session_state.get('import_job_uids', []) + [
+                    submit_import_job(batch_id)
+                ]
+                _clear_import_state()
                 st.rerun()
         
         with col2:
             if st.button("❌ Cancel", use_container_width=True):
-                del st.session_state.pending_imports
-                del st.session_state.show_import_confirmation
-                if 'show_import_preview' in st.session_state:
-                    del st.session_state.show_import_preview
-                if 'import_preview_df' in st.session_state:
-                    del st.session_state.import_preview_df
-                st.session_state.show_batch_import = False
+                db.discard_staged_import(batch_id)
+                _clear_import_state()
+                st.rerun()
+
+def render_import_jobs():
+    """Show progress of this session's import jobs and any unfinished job"""
+    job_uids = list(st.session_state.get('import_job_uids', []))
+    for job in db.get_unfinished_import_jobs():
+        if job.uid not in job_uids:
+            job_uids.append(job.uid)
+    
+    for job_uid in job_uids:
+        job = db.get_import_job(job_uid)
+        if not job:
+            continue
+        if job.status in (ImportJobStatus.QUEUED, ImportJobStatus.RUNNING) and not is_job_interrupted(job):
+            _poll_import_job(job_uid)
+        else:
+            _render_import_job(job)
+
+@st.fragment(run_every=1)
+def _poll_import_job(job_uid):
+    """Re-render a running job every second without rerunning the page"""
+    job = db.get_import_job(job_uid)
+    _render_import_job(job)
+    if job.status not in (ImportJobStatus.QUEUED, ImportJobStatus.RUNNING):
+        # Refresh the component list and stop polling
+        st.rerun(scope="app")
+
+def _render_import_job(job):
+    with st.container(border=True):
+        progress = job.processed_rows / job.total_rows if job.total_rows else 1.0
+        interrupted = is_job_interrupted(job)
+        
+        if job.status == ImportJobStatus.COMPLETED:
+            st.success(f"🎉 Import finished: {job.created_count} new, {job.updated_count} updated, "
+                       f"{job.skipped_count} skipped")
+        elif interrupted:
+            st.error(f"❌ Import stopped at row {job.checkpoint_row_no} "
+                     f"({job.processed_rows} of {job.total_rows} processed)"
+                     + (f": {job.error}" if job.error else ""))
+        else:
+            st.progress(progress, text=f"📦 Importing... {job.processed_rows} of {job.total_rows} rows "
+                                       f"({job.created_count} new, {job.updated_count} updated)")
+        
+        row_errors = json.loads(job.row_errors or "[]")
+        if row_errors:
+            with st.expander(f"⚠️ {len(row_errors)} row(s) could not be imported"):
+                st.dataframe(pd.DataFrame(row_errors), use_container_width=True, hide_index=True)
+        
+        if interrupted:
+            col1, col2, col3 = st.columns([1, 1, 4])
+            with col1:
+                if st.button("🔄 Resume", key=f"resume_job_{job.uid}", type="primary", use_container_width=True):
+                    resume_import_job(job.uid)
+                    st.rerun()
+            with col2:
+                if st.button("🗑️ Discard", key=f"discard_job_{job.uid}", use_container_width=True):
+                    db.discard_staged_import(job.batch_id)
+                    db.set_import_job_status(job.uid, ImportJobStatus.CANCELLED, error=job.error)
+                    st.rerun()
+        elif job.status in (ImportJobStatus.COMPLETED, ImportJobStatus.CANCELLED):
+            if st.button("Dismiss", key=f"dismiss_job_{job.uid}"):
+                st.session_state.import_job_uids = [
+                    uid for uid in st.session_state.get('import_job_uids', []) if uid != job.uid
+                ]
                 st.rerun()
@@ -47,3 +47,9 @@ def render_component_detail(uid):
         st.info(component.description)
     else:
         st.info("No description provided")
+    
+    references = db.get_component_references(uid)
+    if references:
+        with st.expander(f"💾 DM References ({len(references)})"):
+            for ref in references:
+                st.markdown(f"- `{ref.key}` **{ref.value}** at `{ref.path}`")
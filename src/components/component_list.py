@@ -7,7 +7,10 @@ from src.utils.helpers import get_type_options
 from src.utils.database import db
 from src.components.component_form import render_component_form
 from src.components.component_detail import render_component_detail
-from src.components.batch_import import render_batch_import, confirm_and_import
+from src.components.batch_import import render_batch_import, confirm_and_import, render_import_jobs
+from src.components.search_box import render_search_box
+from src.utils.read_model import list_components
+from src.utils.trigram_index import fuzzy_search_components
 
 def render_component_list(category=None, title="All Components"):
     """Render list of components with filtering and pagination"""
@@ -17,7 +20,8 @@ def render_component_list(category=None, title="All Components"):
     col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
     
     with col1:
-        search = st.text_input("🔍 Search", placeholder="Name, ID, or description...")
+        search = render_search_box(category)
+        fuzzy = st.toggle("Fuzzy match", help="Tolerate typos and word order (trigram similarity)")
     
     with col2:
         if category:
@@ -49,6 +53,9 @@ def render_component_list(category=None, title="All Components"):
     
     st.markdown("---")
     
+    # Progress of background imports
+    render_import_jobs()
+    
     # Show batch import if active
     if st.session_state.get('show_batch_import'):
         render_batch_import()
@@ -69,19 +76,16 @@ def render_component_list(category=None, title="All Components"):
     
     # Fetch components
     search_term = search if search else None
-    components, total = db.get_all_components(
+    fetch_components = fuzzy_search_components if fuzzy and search_term else list_components
+    components, total = fetch_components(
         category=category,
         type_filter=type_filter,
+        change_type=ChangeType(change_filter) if change_filter != "All" else None,
         search=search_term,
         limit=page_size,
         offset=st.session_state.current_page * page_size
     )
     
-    # Apply change type filter
-    if change_filter != "All":
-        components = [c for c in components if c.change_type.value == change_filter]
-        total = len(components)
-    
     # Display count
     st.markdown(f"**Showing {len(components)} of {total} components**")
     
@@ -0,0 +1,35 @@
+"""Debounced as-you-type search box with prefix suggestions"""
+
+import streamlit as st
+from src.config import SEARCH_DEBOUNCE_MS, SEARCH_SUGGESTION_LIMIT
+from src.utils.search_index import suggest_components
+
+try:
+    from st_keyup import st_keyup
+except ImportError:  # Fall back to the built-in input (fires on Enter)
+    st_keyup = None
+
+
+def render_search_box(category=None):
+    """Render the search input with suggestions and return the search term"""
+    key = f"component_search_{category.name if category else 'all'}"
+    
+    if st_keyup is not None:
+        search = st_keyup(
+            "🔍 Search",
+            key=key,
+            debounce=SEARCH_DEBOUNCE_MS,
+            placeholder="Name, ID, or description..."
+        )
+    else:
+        search = st.text_input("🔍 Search", key=key, placeholder="Name, ID, or description...")
+    
+    # Suggestions come from the in-memory index, not the database
+    suggestions = suggest_components(search, limit=SEARCH_SUGGESTION_LIMIT, category=category) if search else []
+    for suggestion in suggestions:
+        label = f"↪ {suggestion['name']} ({suggestion['component_id']})"
+        if st.button(label, key=f"{key}_suggest_{suggestion['uid']}", type="tertiary"):
+            st.session_state.selected_component_uid = suggestion['uid']
+            st.rerun()
+    
+    return search
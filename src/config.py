@@ -27,3 +27,44 @@ def get_database_url():
 VP_TYPES = ["API", "DJOB", "Function", "Workflow", "Integration"]
 EM_TYPES = ["Single UI", "Multiple UI", "Dashboard", "Form", "Report"]
 DM_TYPES = ["Schema", "Table", "View", "Stored Procedure", "ETL Pipeline"]
+
+# As-you-type search settings
+SEARCH_DEBOUNCE_MS = int(os.getenv('SEARCH_DEBOUNCE_MS', '300'))
+SEARCH_SUGGESTION_LIMIT = 5
+
+# In-process columnar read model of the components table (optional)
+READ_MODEL_ENABLED = os.getenv('READ_MODEL_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+READ_MODEL_MAX_MB = int(os.getenv('READ_MODEL_MAX_MB', '256'))
+READ_MODEL_REFRESH_SECONDS = float(os.getenv('READ_MODEL_REFRESH_SECONDS', '5'))
+
+# Fuzzy (trigram) search settings
+FUZZY_SEARCH_THRESHOLD = float(os.getenv('FUZZY_SEARCH_THRESHOLD', '0.5'))
+FUZZY_SEARCH_MAX_RESULTS = 1000
+
+# Batch import URL routes (see src/utils/url_patterns.json for the format)
+URL_PATTERNS_PATH = os.getenv(
+    'URL_PATTERNS_PATH',
+    os.path.join(os.path.dirname(__file__), 'utils', 'url_patterns.json')
+)
+
+# Background import jobs
+IMPORT_JOB_WORKERS = int(os.getenv('IMPORT_JOB_WORKERS', '2'))
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '500'))
+IMPORT_JOB_STALE_SECONDS = 120  # A running job silent this long is treated as interrupted
+
+# Data Manager index (form_data_id -> tablegroup_id)
+DM_INDEX_PATH = os.getenv(
+    'DM_INDEX_PATH',
+    os.path.join(os.path.dirname(__file__), 'utils', 'indexed-data-managers.json')
+)
+DM_INDEX_CHECK_SECONDS = float(os.getenv('DM_INDEX_CHECK_SECONDS', '5'))
+
+# Audit trail API client
+AUDIT_REQUEST_TIMEOUT = float(os.getenv('AUDIT_REQUEST_TIMEOUT', '30'))
+AUDIT_FETCH_WORKERS = int(os.getenv('AUDIT_FETCH_WORKERS', '4'))  # Concurrent page requests in "fetch all" mode
+AUDIT_MAX_RETRIES = int(os.getenv('AUDIT_MAX_RETRIES', '3'))  # Retries on 429 and 5xx responses
+AUDIT_RETRY_BACKOFF = float(os.getenv('AUDIT_RETRY_BACKOFF', '0.5'))  # Seconds, doubled on each retry
+AUDIT_HOST_CONCURRENCY = int(os.getenv('AUDIT_HOST_CONCURRENCY', '8'))  # Requests in flight per API host
+AUDIT_HOST_RATE = float(os.getenv('AUDIT_HOST_RATE', '20'))  # Requests started per second per host; 0 = unlimited
+AUDIT_BATCH_WORKERS = int(os.getenv('AUDIT_BATCH_WORKERS', '8'))  # Records fetched at once in batch mode
+AUDIT_RESULT_TTL = float(os.getenv('AUDIT_RESULT_TTL', '10'))  # Seconds an identical request reuses a result; 0 = off
@@ -1,6 +1,6 @@
 """Database models and enums"""
 
-from sqlalchemy import Column, String, DateTime, Enum, Text
+from sqlalchemy import Column, String, DateTime, Enum, Text, Integer, BigInteger, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import uuid
@@ -12,6 +12,12 @@ class ChangeType(enum.Enum):
     NEW = "New"
     UPDATED = "Updated"
 
+class ImportStatus(enum.Enum):
+    NEW = "New"
+    CHANGED = "Changed"
+    UNCHANGED = "Unchanged"
+    DUPLICATE = "Duplicate"
+
 class Category(enum.Enum):
     VP = "Visual Programming"
     EM = "Experience Manager"
@@ -21,7 +27,7 @@ class Component(Base):
     __tablename__ = 'components'
     
     uid = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    component_id = Column(String, nullable=False)
+    component_id = Column(String, nullable=False, index=True)
     name = Column(String, nullable=False)
     url_link = Column(String, nullable=False)
     change_type = Column(Enum(ChangeType), nullable=False)
@@ -76,3 +82,110 @@ class ApiRequest(Base):
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
         }
+
+
+class ComponentReference(Base):
+    """A DM table referenced by a component's exported JSON (reverse-dependency index)"""
+    __tablename__ = 'component_references'
+    __table_args__ = (
+        Index('ix_component_references_value_key', 'value', 'key'),
+        Index('uq_component_references_ref', 'component_uid', 'key', 'value', 'path', unique=True),
+    )
+    
+    uid = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    component_uid = Column(String, nullable=False, index=True)
+    key = Column(String, nullable=False)  # form_data_id or tablegroup_id
+    value = Column(String, nullable=False)
+    path = Column(String, nullable=False)  # JSON path inside the export
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ImportStagingRow(Base):
+    """Component parsed by a batch import, reviewed here before promotion to `components`"""
+    __tablename__ = 'import_staging'
+    __table_args__ = (
+        Index('ix_import_staging_batch_row', 'batch_id', 'row_no'),
+        Index('ix_import_staging_batch_component', 'batch_id', 'component_id', 'category', 'row_no'),
+    )
+    
+    uid = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))  # Becomes the component uid
+    batch_id = Column(String, nullable=False)
+    row_no = Column(Integer, nullable=False)  # Line number in the pasted text
+    component_id = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    url_link = Column(String, nullable=False)
+    change_type = Column(Enum(ChangeType), nullable=False)
+    description = Column(String, default="")
+    category = Column(Enum(Category), nullable=False)
+    type = Column(String, nullable=False)
+    status = Column(Enum(ImportStatus), nullable=False, default=ImportStatus.NEW)  # Compared with `components`
+    existing_uid = Column(String)  # Matching component, if any
+    # Edited in the preview; otherwise a changed component keeps its own description and type
+    description_edited = Column(Boolean, default=False)
+    type_edited = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ImportJobStatus(enum.Enum):
+    QUEUED = "Queued"
+    RUNNING = "Running"
+    COMPLETED = "Completed"
+    FAILED = "Failed"
+    CANCELLED = "Cancelled"
+
+
+class ImportJob(Base):
+    """Background promotion of a staged batch, committed chunk by chunk"""
+    __tablename__ = 'import_jobs'
+    
+    uid = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    batch_id = Column(String, nullable=False, index=True)
+    status = Column(Enum(ImportJobStatus), nullable=False, default=ImportJobStatus.QUEUED)
+    total_rows = Column(Integer, nullable=False, default=0)
+    processed_rows = Column(Integer, nullable=False, default=0)
+    created_count = Column(Integer, nullable=False, default=0)
+    updated_count = Column(Integer, nullable=False, default=0)
+    skipped_count = Column(Integer, nullable=False, default=0)
+    checkpoint_row_no = Column(Integer, nullable=False, default=0)  # Last row_no of the last committed chunk
+    row_errors = Column(Text, default="[]")  # JSON string of [{row_no, component_id, error}]
+    error = Column(Text, default="")  # Why the job stopped, if it failed
+    owner = Column(String)  # Worker that claimed the job; only it may advance the checkpoint
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'uid': self.uid,
+            'batch_id': self.batch_id,
+            'status': self.status.value if isinstance(self.status, ImportJobStatus) else self.status,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'created_count': self.created_count,
+            'updated_count': self.updated_count,
+            'skipped_count': self.skipped_count,
+            'checkpoint_row_no': self.checkpoint_row_no,
+            'row_errors': self.row_errors,
+            'error': self.error,
+            'owner': self.owner,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
+        }
+
+
+class AuditEvent(Base):
+    """Audit trail event cached locally, so a record's history can be browsed offline and synced incrementally"""
+    __tablename__ = 'audit_events'
+    __table_args__ = (
+        Index('ux_audit_events_record_event', 'form_data_id', 'record_id', 'event_id', unique=True),
+        Index('ix_audit_events_record_timestamp', 'form_data_id', 'record_id', 'timestamp'),
+    )
+    
+    uid = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    form_data_id = Column(String, nullable=False)
+    record_id = Column(String, nullable=False)
+    event_id = Column(String, nullable=False)  # The event's `id`, or a hash of its content when it has none
+    timestamp = Column(BigInteger, nullable=False, default=0)  # Milliseconds since the epoch
+    action = Column(String, default="")
+    email = Column(String, default="")
+    payload = Column(Text, nullable=False)  # JSON string of the event as returned by the API
+    fetched_at = Column(DateTime, default=datetime.utcnow)
@@ -3,6 +3,421 @@
 import streamlit as st
 import requests
 import json
+from datetime import datetime
+from pathlib import Path
+from src.utils.audit_client import (
+    AuditTrailError, fetch_all_audit_events, fetch_many_audit_trails, parse_record_pairs, stream_audit_trail,
+    sync_audit_events
+)
+from src.utils.audit_events import (
+    MISSING, AuditEventStore, RecordHistory, diff_event, events_to_frame, filter_events, changed_columns_frame
+)
+from src.utils.database import db
+
+RECORDS_PAGE_SIZE = 50
+PREVIEW_CHARS = 200
+VIEW_KEYS = ('audit_filter_actions', 'audit_filter_emails', 'audit_filter_automation_ids',
+             'audit_filter_columns', 'audit_filter_time', 'audit_table_view',
+             'audit_history_field', 'audit_state_date', 'audit_state_time', 'audit_raw_offset')
+RAW_WINDOW_BYTES = 64 * 1024
+HISTORY_MAX_BYTES = 20 * 1024 * 1024  # Largest streamed body whose field history can be built
+
+
+def _format_ms(timestamp):
+    if not timestamp:
+        return "N/A"
+    return datetime.fromtimestamp(timestamp / 1000).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _reset_records_view():
+    """Back to the first page and no filters, for a new response"""
+    st.session_state.audit_trail_page = 0
+    for key in VIEW_KEYS:
+        st.session_state.pop(key, None)
+
+
+def _discard_response():
+    """Forget the current response, deleting its spilled body if it was streamed"""
+    response_data = st.session_state.get('audit_trail_response')
+    if response_data and isinstance(response_data["data"], dict):
+        records = response_data["data"].get("data")
+        if isinstance(records, AuditEventStore):
+            records.close()
+    st.session_state.audit_trail_response = None
+
+
+def _load_cached_response(form_data_id, record_id, descending=True, sync=None):
+    """Show a record's cached audit trail in place of an API response"""
+    _discard_response()
+    st.session_state.audit_trail_error = None
+    _reset_records_view()
+    st.session_state.audit_trail_response = {
+        "status_code": 200,
+        "data": {"data": db.get_audit_events(form_data_id, record_id, descending=descending)},
+        "cached": {"form_data_id": form_data_id, "record_id": record_id, "sync": sync}
+    }
+
+
+def _truncate_json(value):
+    text = json.dumps(value, ensure_ascii=False) if value else ""
+    return (text[:PREVIEW_CHARS] + "...") if len(text) > PREVIEW_CHARS else text
+
+
+def _format_value(value):
+    if value is MISSING:
+        return "—"
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return (text[:PREVIEW_CHARS] + "...") if len(text) > PREVIEW_CHARS else text
+
+
+def _record_preview(record):
+    """Header fields, truncated data and field changes of one record, as displayed"""
+    new_data = record.get("new_data", {})
+    old_data = record.get("old_data", {})
+    automation_id = new_data.get("automation_id", "") if isinstance(new_data, dict) else ""
+    
+    timestamp = record.get("timestamp", "")
+    timestamp_display = ""
+    if timestamp:
+        try:
+            # Assuming timestamp is in milliseconds
+            timestamp_display = _format_ms(timestamp)
+        except (TypeError, ValueError, OverflowError, OSError):
+            timestamp_display = str(timestamp)
+    
+    return {
+        "action": record.get("action", "N/A"),
+        "name": record.get("name", ""),
+        "email": record.get("email", ""),
+        "timestamp": timestamp_display,
+        "automation_id": automation_id,
+        "new_data": _truncate_json(new_data),
+        "old_data": _truncate_json(old_data),
+        "changes": [
+            {"Field": change.path, "Change": change.kind,
+             "Old": _format_value(change.old), "New": _format_value(change.new)}
+            for change in diff_event(record)
+        ]
+    }
+
+
+def render_record_filters(response_data, records):
+    """
+    Filter records by action, user, automation, changed column and time.
+    
+    The events DataFrame is built once per response and kept with it; every
+    filter is a vectorized mask over it.
+    
+    Returns:
+        Positions of the matching records
+    """
+    frame = response_data.get("frame")
+    if frame is None or len(frame) != len(records):
+        frame = response_data["frame"] = events_to_frame(records)
+    
+    def reset_page():
+        st.session_state.audit_trail_page = 0
+    
+    def options(column):
+        return sorted(v for v in frame[column].unique() if v)
+    
+    with st.expander("🔎 Filter Records"):
+        col1, col2 = st.columns(2)
+        with col1:
+            actions = st.multiselect("Action", options("action"), key="audit_filter_actions", on_change=reset_page)
+            automation_ids = st.multiselect("Automation ID", options("automation_id"),
+                                            key="audit_filter_automation_ids", on_change=reset_page)
+        with col2:
+            emails = st.multiselect("User Email", options("email"), key="audit_filter_emails", on_change=reset_page)
+            columns = st.multiselect("Changed Column", sorted(changed_columns_frame(frame)['column'].unique()),
+                                     key="audit_filter_columns", on_change=reset_page)
+        
+        start = end = None
+        times = frame['time'].dropna()
+        if len(times) and times.min() < times.max():
+            first, last = times.min().to_pydatetime(), times.max().to_pydatetime()
+            start, end = st.slider("Time Range", min_value=first, max_value=last, value=(first, last),
+                                   format="YYYY-MM-DD HH:mm", key="audit_filter_time", on_change=reset_page)
+            if (start, end) == (first, last):
+                start = end = None
+        
+        st.toggle("Table View", key="audit_table_view", help="Show the matching records as one table")
+    
+    positions = filter_events(frame, actions=actions, emails=emails, automation_ids=automation_ids,
+                              columns=columns, start=start, end=end)
+    if st.session_state.get("audit_table_view"):
+        st.dataframe(frame.iloc[positions], use_container_width=True, hide_index=True)
+    return positions
+
+
+def render_records_page(response_data, records, positions=None):
+    """
+    Render one page of audit trail records.
+    
+    Previews are computed the first time a record is shown and kept with the
+    response, so paging back and forth or rerunning never re-serializes them.
+    
+    Args:
+        positions: Indexes of the records to page through (all by default)
+    
+    Returns:
+        Indexes of the records shown
+    """
+    if not records:
+        st.info("No audit trail records found.")
+        return []
+    if positions is None:
+        positions = range(len(records))
+    if not len(positions):
+        st.info("No audit trail records match the filters.")
+        return []
+    
+    previews = response_data.get("previews")
+    if previews is None or len(previews) != len(records):
+        previews = response_data["previews"] = [None] * len(records)
+    
+    total_pages = (len(positions) + RECORDS_PAGE_SIZE - 1) // RECORDS_PAGE_SIZE
+    page = min(st.session_state.get('audit_trail_page', 0), total_pages - 1)
+    start = page * RECORDS_PAGE_SIZE
+    end = min(start + RECORDS_PAGE_SIZE, len(positions))
+    shown = [int(idx) for idx in positions[start:end]]
+    
+    if len(positions) < len(records):
+        st.write(f"**Matching Records:** {len(positions)} of {len(records)}")
+    else:
+        st.write(f"**Total Records:** {len(records)}")
+    
+    for idx in shown:
+        record = records[idx]
+        preview = previews[idx]
+        if preview is None:
+            preview = previews[idx] = _record_preview(record)
+        automation_id = preview["automation_id"]
+        
+        # Create expander for each record
+        with st.expander(f"**#{idx + 1}** | {preview['action']} | {preview['timestamp']} | {automation_id if automation_id else 'N/A'}", expanded=False):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.markdown(f"**Action:** `{preview['action']}`")
+                st.markdown(f"**User:** {preview['name']}")
+                st.markdown(f"**Email:** {preview['email']}")
+            
+            with col2:
+                st.markdown(f"**Timestamp:** {preview['timestamp']}")
+                st.markdown(f"**Automation ID:** `{automation_id if automation_id else 'N/A'}`")
+            
+            if preview["changes"]:
+                st.markdown(f"**🧮 Changes ({len(preview['changes'])}):**")
+                st.dataframe(preview["changes"], use_container_width=True, hide_index=True)
+            
+            st.markdown("---")
+            
+            for field, label, icon in (("new_data", "New Data", "📥"), ("old_data", "Old Data", "📤")):
+                st.markdown(f"**{icon} {label}:**")
+                st.text(preview[field] if preview[field] else "N/A")
+                if record.get(field):
+                    if st.button(f"🔍 View Full {label}", key=f"{field}_{idx}"):
+                        st.session_state[f"show_{field}_{idx}"] = not st.session_state.get(f"show_{field}_{idx}", False)
+                    
+                    if st.session_state.get(f"show_{field}_{idx}", False):
+                        st.json(record[field])
+                
+                if field == "new_data":
+                    st.markdown("---")
+    
+    # Pagination
+    if total_pages > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        
+        with col1:
+            if st.button("⬅️ Previous", key="audit_trail_prev", disabled=page == 0):
+                st.session_state.audit_trail_page = page - 1
+                st.rerun()
+        
+        with col2:
+            st.markdown(f"<center>Page {page + 1} of {total_pages} ({len(positions)} records)</center>", unsafe_allow_html=True)
+        
+        with col3:
+            if st.button("Next ➡️", key="audit_trail_next", disabled=page >= total_pages - 1):
+                st.session_state.audit_trail_page = page + 1
+                st.rerun()
+    
+    return shown
+
+
+def render_field_history(response_data, records):
+    """Versions of one field, and the whole record as of a chosen time"""
+    history = response_data.get("history")
+    streamed = isinstance(records, AuditEventStore)
+    if history is None and streamed:
+        # Reads every event back from the spill file and keeps all versions, so only on request
+        with st.expander("🕰️ Field History"):
+            if records.size > HISTORY_MAX_BYTES:
+                st.info(f"Field history is not available for responses over "
+                        f"{HISTORY_MAX_BYTES // 1024 // 1024} MB; this one is {records.size / 1024 / 1024:.1f} MB.")
+            elif st.button("🕰️ Build Field History", key="audit_history_build"):
+                response_data["history"] = RecordHistory(records)
+                st.rerun()
+        return
+    if history is None:
+        history = response_data["history"] = RecordHistory(records)
+    if not len(history):
+        return
+    
+    with st.expander(f"🕰️ Field History ({len(history.fields)} fields)", expanded=streamed):
+        if history.fields:
+            field = st.selectbox(
+                "Field",
+                options=sorted(history.fields),
+                format_func=lambda f: f"{f} ({len(history.fields[f])} changes)",
+                key="audit_history_field"
+            )
+            st.dataframe(
+                [
+                    {
+                        "Time": _format_ms(version.timestamp),
+                        "Value": _format_value(version.value),
+                        "User": version.name,
+                        "Email": version.email,
+                        "Automation ID": version.automation_id
+                    }
+                    for version in reversed(history.field_history(field))
+                ],
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        st.markdown("**Record as of:**")
+        latest = datetime.fromtimestamp(history.timestamps[-1] / 1000)
+        col1, col2 = st.columns(2)
+        with col1:
+            day = st.date_input("Date", value=latest.date(), key="audit_state_date")
+        with col2:
+            moment = st.time_input("Time", value=latest.time().replace(microsecond=0), step=60, key="audit_state_time")
+        when = int(datetime.combine(day, moment).timestamp() * 1000) + 999  # Include the whole second
+        
+        state = history.state_at(when)
+        if not state:
+            st.info("The record had no recorded fields at that time.")
+        else:
+            st.dataframe(
+                [
+                    {
+                        "Field": path,
+                        "Value": _format_value(value),
+                        "Set": _format_ms(version.timestamp) if version else "before the first event",
+                        "By": (version.automation_id or version.email) if version else ""
+                    }
+                    for path, value in sorted(state.items())
+                    for version in [history.value_at(path, when)]
+                ],
+                use_container_width=True,
+                hide_index=True
+            )
+
+
+def render_request_timings(timings):
+    """Per-call timings of the last fetch"""
+    seconds = sorted(t["seconds"] for t in timings)
+    retries = sum(t["retries"] for t in timings)
+    p95 = seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))]
+    with st.expander(f"⏱️ Request Timings ({len(timings)} calls, p95 {p95 * 1000:.0f} ms, {retries} retries)"):
+        st.dataframe(
+            [
+                {
+                    "Page": t["page"],
+                    "Status": t["status_code"],
+                    "Source": t["source"],
+                    "Total (ms)": round(t["seconds"] * 1000),
+                    "Server (ms)": round(t["server_seconds"] * 1000),
+                    "Retries": t["retries"],
+                    "On the wire (KB)": round(t["wire_bytes"] / 1024, 1),
+                    "Body (KB)": round(t["body_bytes"] / 1024, 1)
+                }
+                for t in timings
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+
+
+def render_cached_audit_trails():
+    """Browse audit trails synced to the local cache, without calling the API"""
+    cached_records = db.get_cached_audit_records()
+    with st.expander(f"🗄️ Cached Audit Trails ({len(cached_records)})"):
+        if not cached_records:
+            st.info("Nothing cached yet. Turn on \"Sync to Local Cache\" and fetch a record.")
+            return
+        
+        selected = st.selectbox(
+            "Record",
+            options=cached_records,
+            format_func=lambda r: (f"{r['form_data_id']} / {r['record_id']} — {r['events']:,} events, "
+                                   f"latest {_format_ms(r['latest_timestamp'])}"),
+            key="audit_cached_record"
+        )
+        col1, col2, _ = st.columns([1, 1, 3])
+        with col1:
+            if st.button("📂 Open Offline", key="audit_cached_open"):
+                _load_cached_response(selected['form_data_id'], selected['record_id'])
+                st.session_state.audit_trail_timings = []
+                st.rerun()
+        with col2:
+            if st.button("🗑️ Delete Cache", key="audit_cached_delete"):
+                db.delete_cached_audit_events(selected['form_data_id'], selected['record_id'])
+                st.rerun()
+
+
+def render_visible_json(data, records, shown):
+    """The response body restricted to the records on the current page"""
+    if len(records) > len(shown):
+        st.caption(f"The {len(shown)} records on the page above, of {len(records)}. "
+                   "Download for the full body.")
+    visible = {**data, "data": [records[idx] for idx in shown]}
+    st.json(visible)
+    
+    with st.expander("📋 Copy as Text"):
+        st.code(json.dumps(visible, indent=2, ensure_ascii=False), language="json")
+    
+    st.download_button(
+        "⬇️ Download Full Response",
+        # Serialized only when clicked
+        data=lambda: json.dumps(data, indent=2, ensure_ascii=False),
+        file_name="audit_trail.json",
+        mime="application/json",
+        on_click="ignore"
+    )
+
+
+def render_raw_window(store):
+    """A bounded window of a streamed response body, read from its spill file"""
+    size = store.size
+    window_kb = RAW_WINDOW_BYTES // 1024
+    if size > RAW_WINDOW_BYTES:
+        offset_kb = st.number_input(
+            "Offset (KB)",
+            min_value=0,
+            max_value=max(0, (size - 1) // 1024),
+            value=0,
+            step=window_kb,
+            key="audit_raw_offset",
+            help=f"The body is {size / 1024 / 1024:.1f} MB; {window_kb} KB are shown at a time"
+        )
+    else:
+        offset_kb = 0
+    offset = offset_kb * 1024
+    st.caption(f"Bytes {offset:,}–{min(offset + RAW_WINDOW_BYTES, size):,} of {size:,}")
+    st.code(store.read_raw(offset, RAW_WINDOW_BYTES), language="json")
+    
+    st.download_button(
+        "⬇️ Download Full Response",
+        # Read from the spill file only when clicked
+        data=lambda: Path(store.path).read_bytes(),
+        file_name="audit_trail.json",
+        mime="application/json",
+        on_click="ignore"
+    )
 
 
 def render_audit_trail():
@@ -16,6 +431,8 @@ def render_audit_trail():
         st.session_state.audit_trail_response = None
     if 'audit_trail_error' not in st.session_state:
         st.session_state.audit_trail_error = None
+    if 'audit_trail_timings' not in st.session_state:
+        st.session_state.audit_trail_timings = []
     
     # Input section
     st.subheader("📥 API Configuration")
@@ -44,6 +461,28 @@ def render_audit_trail():
         help="Enable to provide a custom JSON request body instead of using the form fields"
     )
     
+    batch_mode = st.toggle(
+        "Batch Mode",
+        value=False,
+        disabled=use_custom_body,
+        help="Query every page of many (form_data_id, record_id) pairs at once and merge them into one table"
+    ) and not use_custom_body
+    
+    fetch_all = st.toggle(
+        "Fetch All Pages",
+        value=False,
+        disabled=batch_mode,
+        help="Request every page concurrently and merge them into one list, newest first unless sorted ascending"
+    ) or batch_mode
+    
+    use_cache = st.toggle(
+        "Sync to Local Cache",
+        value=False,
+        disabled=use_custom_body or batch_mode,
+        help="Keep this record's events in the local database and only request events newer than the "
+             "latest cached one. Cached records can be opened below without the API."
+    ) and not use_custom_body and not batch_mode
+    
     # Initialize variables
     form_data_id = ""
     record_id = ""
@@ -51,6 +490,8 @@ def render_audit_trail():
     limit = 500
     sort_order = ("Descending (newest first)", -1)
     custom_json_input = ""
+    pairs_text = ""
+    pairs_file = None
     
     if use_custom_body:
         # Custom JSON input mode
@@ -78,29 +519,44 @@ def render_audit_trail():
         # Form input mode
         st.subheader("📋 Query Parameters")
         
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            form_data_id = st.text_input(
-                "Form Data ID",
-                placeholder="Enter form_data_id",
-                help="The form_data_id to query"
+        if batch_mode:
+            pairs_text = st.text_area(
+                "Records",
+                placeholder="form_data_id,record_id\nform_a,record_1\nform_b,record_2",
+                height=150,
+                help="One form_data_id and record_id per line, separated by a comma, tab or space"
             )
-        
-        with col2:
-            record_id = st.text_input(
-                "Record ID",
-                placeholder="Enter record_id",
-                help="The record_id to filter by"
+            pairs_file = st.file_uploader(
+                "Or upload a CSV",
+                type=["csv", "txt"],
+                help="A CSV with form_data_id and record_id columns, or one pair per line"
             )
+        else:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                form_data_id = st.text_input(
+                    "Form Data ID",
+                    placeholder="Enter form_data_id",
+                    help="The form_data_id to query"
+                )
+            
+            with col2:
+                record_id = st.text_input(
+                    "Record ID",
+                    placeholder="Enter record_id",
+                    help="The record_id to filter by"
+                )
         
         # Advanced options (collapsible)
         with st.expander("⚙️ Advanced Options"):
             adv_col1, adv_col2 = st.columns(2)
             with adv_col1:
-                page_num = st.number_input("Page", min_value=1, value=1, help="Page number for pagination")
+                page_num = st.number_input("Page", min_value=1, value=1, disabled=fetch_all,
+                                           help="Page number for pagination")
             with adv_col2:
-                limit = st.number_input("Limit", min_value=1, max_value=1000, value=500, help="Number of records per page")
+                limit = st.number_input("Limit", min_value=1, max_value=1000, value=500,
+                                        help="Number of records per page")
             
             sort_order = st.selectbox(
                 "Sort Order (by timestamp)",
@@ -118,10 +574,13 @@ def render_audit_trail():
     
     with col2:
         if st.button("🗑️ Clear Results"):
-            st.session_state.audit_trail_response = None
+            _discard_response()
             st.session_state.audit_trail_error = None
+            st.session_state.audit_trail_timings = []
             st.rerun()
     
+    render_cached_audit_trails()
+    
     # Process request
     if submit_btn:
         # Validation
@@ -140,6 +599,28 @@ def render_audit_trail():
             except json.JSONDecodeError as e:
                 st.error(f"Invalid JSON in request body: {str(e)}")
                 return
+            if fetch_all and not (isinstance(request_body, dict)
+                                  and isinstance(request_body.get("sort") or {}, dict)):
+                # Pages are requested by setting "page" and "limit" and merged by the "sort" order
+                st.error("To fetch all pages, the request body must be a JSON object and its \"sort\" an object")
+                return
+            body_limit = request_body.get("limit", 1000) if isinstance(request_body, dict) else 1000
+            if fetch_all and (isinstance(body_limit, bool) or not isinstance(body_limit, int) or body_limit < 1):
+                st.error("To fetch all pages, the request body's \"limit\" must be a positive integer")
+                return
+        elif batch_mode:
+            batch_text = pairs_file.getvalue().decode("utf-8-sig", errors="replace") if pairs_file else pairs_text
+            pairs, pair_errors = parse_record_pairs(batch_text)
+            if not pairs:
+                st.error("Please enter at least one form_data_id and record_id pair")
+                return
+            
+            # Template for every record's request
+            request_body = {
+                "sort": {
+                    "timestamp": sort_order[1]
+                }
+            }
         else:
             # Validate form fields
             if not form_data_id.strip():
@@ -163,36 +644,91 @@ def render_audit_trail():
                 }
             }
         
-        # Build headers
-        headers = {
-            "Authorization": f"Bearer {auth_token.strip()}",
-            "Content-Type": "application/json"
-        }
-        
         # Make request
+        _discard_response()
         with st.spinner("Fetching audit trail..."):
+            timings = []
             try:
-                response = requests.post(
-                    api_url.strip(),
-                    headers=headers,
-                    json=request_body,
-                    timeout=30
-                )
-                
-                # Store response in session state
                 st.session_state.audit_trail_error = None
                 
-                try:
+                if batch_mode:
+                    progress = st.progress(0.0, text=f"Fetching {len(pairs)} records...")
+                    result = fetch_many_audit_trails(
+                        api_url.strip(),
+                        auth_token.strip(),
+                        pairs,
+                        body=request_body,
+                        limit=limit,
+                        timings=timings,
+                        on_progress=lambda done, total, failed: progress.progress(
+                            done / total, text=f"Fetched {done}/{total} records ({failed} failed)"
+                        )
+                    )
                     st.session_state.audit_trail_response = {
-                        "status_code": response.status_code,
-                        "data": response.json()
+                        "status_code": 200,
+                        "data": {"data": result["data"]},
+                        "batch": {
+                            "records": result["records"],
+                            "failures": result["failures"],
+                            "skipped_lines": pair_errors,
+                            "elapsed": result["elapsed"]
+                        }
                     }
-                except json.JSONDecodeError:
+                elif use_cache:
+                    progress = st.progress(0.0, text="Syncing...")
+                    sync = sync_audit_events(
+                        api_url.strip(),
+                        auth_token.strip(),
+                        form_data_id.strip(),
+                        record_id.strip(),
+                        request_body,
+                        limit=limit,
+                        timings=timings,
+                        on_progress=lambda pages_done, pages_total, events: progress.progress(
+                            min(pages_done / pages_total, 1.0) if pages_total else 0.5,
+                            text=f"Fetched {pages_done} pages ({events:,} records)"
+                        )
+                    )
+                    _load_cached_response(form_data_id.strip(), record_id.strip(),
+                                          descending=sort_order[1] == -1, sync=sync)
+                elif fetch_all:
+                    progress = st.progress(0.0, text="Fetching page 1...")
+                    
+                    def show_progress(pages_done, pages_total, events):
+                        if pages_total:
+                            progress.progress(min(pages_done / pages_total, 1.0),
+                                              text=f"Fetched {pages_done}/{pages_total} pages ({events:,} records)")
+                        else:
+                            progress.progress(0.5, text=f"Fetched {pages_done} pages ({events:,} records)")
+                    
+                    result = fetch_all_audit_events(
+                        api_url.strip(),
+                        auth_token.strip(),
+                        request_body,
+                        limit=request_body.get("limit", 1000),
+                        on_progress=show_progress,
+                        timings=timings
+                    )
+                    st.session_state.audit_trail_response = {
+                        "status_code": 200,
+                        "data": {"data": result["data"]},
+                        "pages": result["pages"],
+                        "elapsed": result["elapsed"]
+                    }
+                else:
+                    # Streamed to a temp file; only event metadata is kept in the session
+                    status_code, data = stream_audit_trail(api_url.strip(), auth_token.strip(), request_body,
+                                                           timings=timings)
+                    
+                    # Store response in session state
                     st.session_state.audit_trail_response = {
-                        "status_code": response.status_code,
-                        "data": response.text
+                        "status_code": status_code,
+                        "data": data
                     }
                     
+            except AuditTrailError as e:
+                st.session_state.audit_trail_error = f"Request failed: {str(e)}"
+                st.session_state.audit_trail_response = None
             except requests.exceptions.Timeout:
                 st.session_state.audit_trail_error = "Request timed out. Please try again."
                 st.session_state.audit_trail_response = None
@@ -202,6 +738,8 @@ def render_audit_trail():
             except requests.exceptions.RequestException as e:
                 st.session_state.audit_trail_error = f"Request failed: {str(e)}"
                 st.session_state.audit_trail_response = None
+            st.session_state.audit_trail_timings = [t._asdict() for t in timings]
+            _reset_records_view()
         
         st.rerun()
     
@@ -209,6 +747,9 @@ def render_audit_trail():
     if st.session_state.audit_trail_error:
         st.error(st.session_state.audit_trail_error)
     
+    if st.session_state.audit_trail_timings:
+        render_request_timings(st.session_state.audit_trail_timings)
+    
     if st.session_state.audit_trail_response:
         st.markdown("---")
         st.subheader("📤 Response")
@@ -224,99 +765,61 @@ def render_audit_trail():
         else:
             st.error(f"Status Code: {status_code}")
         
+        if "pages" in response_data:
+            st.caption(f"Merged {response_data['pages']} pages in {response_data['elapsed']:.1f}s")
+        cached = response_data.get("cached")
+        if cached:
+            sync = cached["sync"]
+            if sync:
+                st.caption(f"{'Full fetch' if sync['full'] else 'Incremental sync'}: {sync['added']:,} new events "
+                           f"from {sync['pages']} page(s) in {sync['elapsed']:.1f}s — showing the local cache of "
+                           f"{cached['form_data_id']} / {cached['record_id']}")
+            else:
+                st.caption(f"Offline: local cache of {cached['form_data_id']} / {cached['record_id']}")
+        batch = response_data.get("batch")
+        if batch:
+            st.caption(f"Batch: {batch['records']} records fetched in {batch['elapsed']:.1f}s")
+            if batch["skipped_lines"]:
+                st.warning(f"Skipped {len(batch['skipped_lines'])} unreadable lines: "
+                           + "; ".join(batch["skipped_lines"][:5]))
+            if batch["failures"]:
+                with st.expander(f"⚠️ {len(batch['failures'])} records failed"):
+                    st.dataframe(batch["failures"], use_container_width=True, hide_index=True)
+        
         # Display readable audit trail data
         data = response_data["data"]
         
-        if isinstance(data, dict) and "data" in data and isinstance(data["data"], list):
+        records = data.get("data") if isinstance(data, dict) else None
+        if isinstance(records, AuditEventStore) and not records.exists():
+            st.warning("⚠️ The downloaded response body is no longer on disk. Fetch the audit trail again.")
+        elif isinstance(records, (list, AuditEventStore)):
             st.subheader("📋 Audit Trail Records")
             
-            records = data["data"]
-            
-            if not records:
-                st.info("No audit trail records found.")
-            else:
-                st.write(f"**Total Records:** {len(records)}")
-                
-                for idx, record in enumerate(records):
-                    # Extract fields
-                    action = record.get("action", "N/A")
-                    new_data = record.get("new_data", {})
-                    old_data = record.get("old_data", {})
-                    timestamp = record.get("timestamp", "")
-                    name = record.get("name", "")
-                    email = record.get("email", "")
-                    
-                    # Get automation_id from new_data if exists
-                    automation_id = ""
-                    if isinstance(new_data, dict):
-                        automation_id = new_data.get("automation_id", "")
-                    
-                    # Truncate data for display
-                    new_data_str = json.dumps(new_data, ensure_ascii=False) if new_data else ""
-                    old_data_str = json.dumps(old_data, ensure_ascii=False) if old_data else ""
-                    new_data_truncated = (new_data_str[:200] + "...") if len(new_data_str) > 200 else new_data_str
-                    old_data_truncated = (old_data_str[:200] + "...") if len(old_data_str) > 200 else old_data_str
-                    
-                    # Format timestamp
-                    timestamp_display = ""
-                    if timestamp:
-                        from datetime import datetime
-                        try:
-                            # Assuming timestamp is in milliseconds
-                            dt = datetime.fromtimestamp(timestamp / 1000)
-                            timestamp_display = dt.strftime("%Y-%m-%d %H:%M:%S")
-                        except:
-                            timestamp_display = str(timestamp)
-                    
-                    # Create expander for each record
-                    with st.expander(f"**#{idx + 1}** | {action} | {timestamp_display} | {automation_id if automation_id else 'N/A'}", expanded=False):
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.markdown(f"**Action:** `{action}`")
-                            st.markdown(f"**User:** {name}")
-                            st.markdown(f"**Email:** {email}")
-                        
-                        with col2:
-                            st.markdown(f"**Timestamp:** {timestamp_display}")
-                            st.markdown(f"**Automation ID:** `{automation_id if automation_id else 'N/A'}`")
-                        
-                        st.markdown("---")
-                        
-                        # New Data section
-                        st.markdown("**📥 New Data:**")
-                        st.text(new_data_truncated if new_data_truncated else "N/A")
-                        if new_data:
-                            if st.button(f"🔍 View Full New Data", key=f"new_data_{idx}"):
-                                st.session_state[f"show_new_data_{idx}"] = not st.session_state.get(f"show_new_data_{idx}", False)
-                            
-                            if st.session_state.get(f"show_new_data_{idx}", False):
-                                st.json(new_data)
-                        
-                        st.markdown("---")
-                        
-                        # Old Data section
-                        st.markdown("**📤 Old Data:**")
-                        st.text(old_data_truncated if old_data_truncated else "N/A")
-                        if old_data:
-                            if st.button(f"🔍 View Full Old Data", key=f"old_data_{idx}"):
-                                st.session_state[f"show_old_data_{idx}"] = not st.session_state.get(f"show_old_data_{idx}", False)
-                            
-                            if st.session_state.get(f"show_old_data_{idx}", False):
-                                st.json(old_data)
+            positions = render_record_filters(response_data, records) if records else None
+            if records and not batch:
+                # History only makes sense for a single record
+                render_field_history(response_data, records)
+            shown = render_records_page(response_data, records, positions)
             
             st.markdown("---")
-        
-        # Display response data
-        st.subheader("📄 Raw Response Body")
-        
-        if isinstance(data, dict) or isinstance(data, list):
-            # Pretty print JSON
-            st.json(data)
             
-            # Also provide copyable text version
-            with st.expander("📋 Copy as Text"):
-                st.code(json.dumps(data, indent=2, ensure_ascii=False), language="json")
+            # Display response data
+            st.subheader("📄 Raw Response Body")
+            if isinstance(records, AuditEventStore):
+                render_raw_window(records)
+            else:
+                render_visible_json(data, records, shown)
         else:
-            # Plain text response
-            st.code(data)
+            # Display response data
+            st.subheader("📄 Raw Response Body")
+            
+            if isinstance(data, dict) or isinstance(data, list):
+                # Pretty print JSON
+                st.json(data)
+                
+                # Also provide copyable text version
+                with st.expander("📋 Copy as Text"):
+                    st.code(json.dumps(data, indent=2, ensure_ascii=False), language="json")
+            else:
+                # Plain text response
+                st.code(data)
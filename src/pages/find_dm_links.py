@@ -1,51 +1,110 @@
 """Find DM Links page - Extract form_data_ids from JSON and generate URLs"""
 
 import streamlit as st
+import pandas as pd
 import json
-import os
+from src.models.component import Category
+from src.utils.extract_form_data_id import extract_references, scan_references, ingest_references, DM_TABLE_URL
+from src.utils.import_parser import classify_line
+from src.utils.url_patterns import get_url_registry
+from src.utils.dm_index import dm_index
+from src.utils.database import db
 
-def extract_form_data_ids(obj, form_data_ids=None):
+# Pastes larger than this are scanned as a stream instead of parsed whole
+MAX_PARSED_INPUT_BYTES = 5 * 1024 * 1024
+STREAMED_KEYS = ('form_data_id', 'tablegroup_id', 'container_variable')
+MAX_LISTED_LOCATIONS = 20
+
+
+def scan_json_stream(stream):
     """
-    Recursively extract all form_data_id values from a nested JSON structure.
-    
-    Args:
-        obj: The object to search (dict, list, or primitive)
-        form_data_ids: Set to store unique form_data_id values
+    Collect references from raw JSON in bounded memory.
     
     Returns:
-        Set of unique form_data_id values
+        Dict of key -> {value: ["byte N" locations]} like `extract_references`
     """
-    if form_data_ids is None:
-        form_data_ids = set()
-    
-    if isinstance(obj, dict):
-        # Check if current dict has form_data_id key
-        if 'form_data_id' in obj:
-            value = obj['form_data_id']
-            # Only add non-empty strings
-            if value and isinstance(value, str) and value.strip():
-                form_data_ids.add(value)
-        
-        # Recursively check all values in the dictionary
-        for value in obj.values():
-            extract_form_data_ids(value, form_data_ids)
+    references = {key: {} for key in STREAMED_KEYS}
+    for key, value, offset in scan_references(stream, STREAMED_KEYS):
+        locations = references[key].setdefault(value, [])
+        if len(locations) < MAX_LISTED_LOCATIONS:
+            locations.append(f"byte {offset:,}")
+    return references
+
+
+def render_results(references):
+    """Show generated URLs, unknown IDs and other references of an extraction"""
+    sorted_ids = sorted(references['form_data_id'])
     
-    elif isinstance(obj, list):
-        # Recursively check all items in the list
-        for item in obj:
-            extract_form_data_ids(item, form_data_ids)
+    st.markdown("---")
+    st.subheader("📤 Results")
     
-    return form_data_ids
+    if not sorted_ids:
+        st.warning("No form_data_id values found in the provided JSON.")
+    else:
+        st.success(f"Found **{len(sorted_ids)}** unique form_data_id values")
+        
+        # Separate found and not found IDs
+        found_links = []
+        not_found_ids = []
+        
+        for form_id in sorted_ids:
+            tablegroup_id = dm_index.get(form_id)
+            if tablegroup_id:
+                url = DM_TABLE_URL.format(tablegroup_id=tablegroup_id, form_data_id=form_id)
+                found_links.append((form_id, url))
+            else:
+                not_found_ids.append(form_id)
+        
+        # Display found links
+        if found_links:
+            st.markdown("### ✅ Generated URLs")
+            
+            # Create copyable text of all URLs
+            all_urls = "\n".join([f"- {url}" for _, url in found_links])
+            
+            with st.expander("📋 Copy All URLs", expanded=True):
+                st.code(all_urls, language=None)
+            
+            render_track_missing(found_links)
+            
+            # Display as clickable links
+            st.markdown("### 🔗 Clickable Links")
+            for form_id, url in found_links:
+                st.markdown(f"- [{form_id}]({url})")
+        
+        # Display not found IDs
+        if not_found_ids:
+            st.markdown("---")
+            st.warning(f"⚠️ {len(not_found_ids)} form_data_id(s) not found in indexed-data-managers.json:")
+            for form_id in not_found_ids:
+                st.markdown(f"- `{form_id}`")
+    
+    # Other references with where they appear
+    other_refs = [
+        {'Key': key, 'Value': value, 'Found At': ", ".join(paths[:MAX_LISTED_LOCATIONS])}
+        for key, values in references.items() if key != 'form_data_id'
+        for value, paths in values.items()
+    ]
+    if other_refs:
+        with st.expander(f"🧩 Other References ({len(other_refs)})"):
+            st.dataframe(pd.DataFrame(other_refs), use_container_width=True, hide_index=True)
 
 
-def load_id_to_tablegroup_mapping():
-    """Load the indexed-data-managers.json mapping file"""
-    json_path = os.path.join(os.path.dirname(__file__), '..', 'utils', 'indexed-data-managers.json')
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+def render_track_missing(found_links):
+    """One-click bulk insert of the linked DM tables that are not tracked yet"""
+    tracked = db.get_tracked_component_ids([form_id for form_id, _ in found_links], Category.DM)
+    missing = [(form_id, url) for form_id, url in found_links if form_id not in tracked]
+    
+    if not missing:
+        st.caption(f"✅ All {len(found_links)} linked table(s) are already tracked as Data Manager components")
+        return
+    
+    st.caption(f"{len(found_links) - len(missing)} of {len(found_links)} linked table(s) already tracked")
+    if st.button(f"➕ Track {len(missing)} Missing DM Table(s)", key="dm_links_track_missing"):
+        registry = get_url_registry()
+        components = [classify_line(f"{form_id} {url}", registry)[0] for form_id, url in missing]
+        created = db.create_missing_components([c for c in components if c])
+        st.success(f"🎉 Added {created} Data Manager component(s)")
 
 
 def render_find_dm_links():
@@ -54,20 +113,36 @@ def render_find_dm_links():
     st.markdown("**Extract form_data_id values from JSON and generate Data Manager URLs**")
     st.markdown("---")
     
-    # Load the ID to tablegroup mapping
-    id_to_tablegroup = load_id_to_tablegroup_mapping()
-    
     # Initialize session state for clear button counter
     if 'dm_links_clear_counter' not in st.session_state:
         st.session_state.dm_links_clear_counter = 0
     
     # JSON input area
     st.subheader("📥 Input JSON")
-    json_input = st.text_area(
-        "Paste your JSON content here:",
-        height=300,
-        placeholder='{\n  "form_data_id": "example_id",\n  "nested": {\n    "form_data_id": "another_id"\n  }\n}',
-        key=f"dm_links_text_area_{st.session_state.dm_links_clear_counter}"
+    input_mode = st.radio("Input", ["Paste JSON", "Upload File"], horizontal=True, label_visibility="collapsed")
+    
+    json_input = ""
+    uploaded_file = None
+    if input_mode == "Paste JSON":
+        json_input = st.text_area(
+            "Paste your JSON content here:",
+            height=300,
+            placeholder='{\n  "form_data_id": "example_id",\n  "nested": {\n    "form_data_id": "another_id"\n  }\n}',
+            key=f"dm_links_text_area_{st.session_state.dm_links_clear_counter}"
+        )
+    else:
+        uploaded_file = st.file_uploader(
+            "Upload a JSON export:",
+            type=["json"],
+            key=f"dm_links_file_{st.session_state.dm_links_clear_counter}",
+            help="Scanned in chunks without loading the whole document, so large studio exports work"
+        )
+    
+    save_references = st.checkbox(
+        "💾 Remember these references on the tracked VP component with the same ID",
+        value=True,
+        help="Pasted exports whose top-level \"id\" matches a tracked component's ID are added to the "
+             "reverse-dependency index used by \"Which components use a table?\" below"
     )
     
     col1, col2, col3 = st.columns([1, 1, 3])
@@ -76,72 +151,84 @@ def render_find_dm_links():
     with col2:
         if st.button("🗑️ Clear"):
             st.session_state.dm_links_clear_counter += 1
+            st.session_state.pop('dm_links_results', None)
             st.rerun()
     
-    if process_btn and json_input.strip():
+    if process_btn and (json_input.strip() or uploaded_file):
         try:
-            # Parse JSON input
-            data = json.loads(json_input)
-            
-            # Extract form_data_ids
-            form_data_ids = extract_form_data_ids(data)
-            sorted_ids = sorted(form_data_ids)
-            
-            st.markdown("---")
-            st.subheader("📤 Results")
-            
-            if not sorted_ids:
-                st.warning("No form_data_id values found in the provided JSON.")
+            if uploaded_file is not None:
+                # Large exports: stream through the file instead of parsing it
+                with st.spinner(f"Scanning {uploaded_file.name}..."):
+                    references = scan_json_stream(uploaded_file)
+            elif len(json_input) > MAX_PARSED_INPUT_BYTES:
+                references = scan_json_stream(json_input)
             else:
-                st.success(f"Found **{len(sorted_ids)}** unique form_data_id values")
-                
-                # Separate found and not found IDs
-                found_links = []
-                not_found_ids = []
-                
-                for form_id in sorted_ids:
-                    if form_id in id_to_tablegroup:
-                        tablegroup_id = id_to_tablegroup[form_id]
-                        url = f"https://studio-uat2.smart-cimb.com/#/form-data/table/{tablegroup_id}/{form_id}"
-                        found_links.append((form_id, url))
-                    else:
-                        not_found_ids.append(form_id)
-                
-                # Display found links
-                if found_links:
-                    st.markdown("### ✅ Generated URLs")
-                    
-                    # Create copyable text of all URLs
-                    all_urls = "\n".join([f"- {url}" for _, url in found_links])
-                    
-                    with st.expander("📋 Copy All URLs", expanded=True):
-                        st.code(all_urls, language=None)
-                    
-                    # Display as clickable links
-                    st.markdown("### 🔗 Clickable Links")
-                    for form_id, url in found_links:
-                        st.markdown(f"- [{form_id}]({url})")
-                
-                # Display not found IDs
-                if not_found_ids:
-                    st.markdown("---")
-                    st.warning(f"⚠️ {len(not_found_ids)} form_data_id(s) not found in indexed-data-managers.json:")
-                    for form_id in not_found_ids:
-                        st.markdown(f"- `{form_id}`")
-                        
+                try:
+                    data = json.loads(json_input)
+                except RecursionError:
+                    # json.loads recurses per nesting level; scan documents nested deeper than it can parse
+                    data = None
+                    references = scan_json_stream(json_input)
+                    st.info("ℹ️ This JSON is nested too deeply to parse, so it was scanned as a stream: "
+                            "locations are byte offsets and references are not saved.")
+                else:
+                    # Extract form_data_ids and the other references in one pass
+                    references = extract_references(data)
+                if save_references and isinstance(data, dict):
+                    component, (added, removed) = ingest_references(data.get('id'), (
+                        (key, value, path)
+                        for key, values in references.items()
+                        for value, paths in values.items()
+                        for path in paths
+                    ))
+                    if component:
+                        st.info(f"💾 Saved references of **{component.name}** "
+                                f"({added} added, {removed} removed)")
+            # Kept so actions on the results survive reruns
+            st.session_state.dm_links_results = references
         except json.JSONDecodeError as e:
+            st.session_state.pop('dm_links_results', None)
             st.error(f"❌ Invalid JSON: {str(e)}")
     elif process_btn:
-        st.warning("Please paste some JSON content first.")
+        st.warning("Please paste some JSON content or upload a file first.")
+    
+    if st.session_state.get('dm_links_results'):
+        render_results(st.session_state.dm_links_results)
+    
+    # Reverse lookup from the stored references
+    st.markdown("---")
+    st.subheader("🔎 Which components use a table?")
+    table_id = st.text_input("form_data_id or tablegroup_id", key="dm_links_reverse_lookup").strip()
+    if table_id:
+        users = db.get_components_referencing(table_id)
+        if users:
+            for component, count in users:
+                st.markdown(f"- [{component.name}]({component.url_link}) `{component.component_id}` "
+                            f"· {count} reference(s)")
+        else:
+            st.info("No tracked component references this table yet. Extract a component's export above "
+                    "to record its references.")
     
     # Help section
     st.markdown("---")
     with st.expander("ℹ️ How to use"):
         st.markdown("""
-        1. **Paste JSON**: Copy and paste your JSON content (e.g., component configuration) into the text area above.
+        1. **Paste JSON or Upload**: Copy and paste your JSON content (e.g., component configuration) into the text area above, or upload a JSON export file. Uploads and very large pastes are scanned as a stream, so they are not validated and report byte offsets instead of JSON paths.
         2. **Click Extract**: Click the "Extract Links" button to process the JSON.
-        3. **View Results**: The tool will recursively search for all `form_data_id` values and generate corresponding Data Manager URLs.
+        3. **View Results**: The tool will search the whole document for all `form_data_id` values and generate corresponding Data Manager URLs.
         4. **Copy URLs**: Use the expandable section to copy all URLs at once, or click individual links to open them.
         
         **Note**: Only `form_data_id` values that exist in the `indexed-data-managers.json` mapping file will have URLs generated.
         """)
+    
+    with st.expander("📇 DM Index"):
+        stats = dm_index.stats()
+        if stats['error']:
+            st.error(stats['error'])
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Entries", stats['entries'])
+        col2.metric("Lookups", stats['lookups'])
+        col3.metric("Misses", stats['misses'])
+        st.caption(f"Loaded {stats['loaded_at']} from {stats['format']} index · sha256 {stats['sha256']} · "
+                   f"{stats['reloads']} load(s) · "
+                   f"reloads automatically when the file changes")
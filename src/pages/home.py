@@ -2,7 +2,7 @@
 
 import streamlit as st
 from src.models.component import Category, ChangeType
-from src.utils.database import db
+from src.utils.read_model import list_components, get_component_stats
 
 def render_home():
     """Render home/dashboard page"""
@@ -13,13 +13,14 @@ def render_home():
     # Statistics
     col1, col2, col3, col4 = st.columns(4)
     
-    vp_components, vp_total = db.get_all_components(category=Category.VP, limit=1000)
-    em_components, em_total = db.get_all_components(category=Category.EM, limit=1000)
-    dm_components, dm_total = db.get_all_components(category=Category.DM, limit=1000)
-    all_components, all_total = db.get_all_components(limit=1000)
+    stats = get_component_stats()
+    all_total = stats['total']
+    vp_total = stats['by_category'].get(Category.VP, 0)
+    em_total = stats['by_category'].get(Category.EM, 0)
+    dm_total = stats['by_category'].get(Category.DM, 0)
     
-    new_count = len([c for c in all_components if c.change_type == ChangeType.NEW])
-    updated_count = len([c for c in all_components if c.change_type == ChangeType.UPDATED])
+    new_count = stats['by_change_type'].get(ChangeType.NEW, 0)
+    updated_count = stats['by_change_type'].get(ChangeType.UPDATED, 0)
     
     with col1:
         st.metric("Total Components", all_total)
@@ -66,7 +67,7 @@ def render_home():
     
     # Recent components
     st.subheader("📅 Recent Components")
-    recent, _ = db.get_all_components(limit=5)
+    recent, _ = list_components(limit=5)
     
     if recent:
         for comp in recent:
@@ -0,0 +1,804 @@
+"""Client for the low-code audit trail API"""
+
+import codecs
+import csv
+import glob
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import NamedTuple
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from src.utils.audit_events import AuditEventStore, event_timestamp
+from src.utils.singleflight import LEADER, SingleFlight
+from src.config import (
+    AUDIT_FETCH_WORKERS, AUDIT_REQUEST_TIMEOUT, AUDIT_MAX_RETRIES, AUDIT_RETRY_BACKOFF,
+    AUDIT_HOST_CONCURRENCY, AUDIT_HOST_RATE, AUDIT_BATCH_WORKERS, AUDIT_RESULT_TTL
+)
+
+MAX_PAGE_LIMIT = 1000
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Where a response may report how many events match the query
+_TOTAL_KEYS = ('total', 'total_count', 'total_data', 'total_records', 'count')
+# Safety stop for servers that ignore the page number
+_MAX_PAGES = 10_000
+STREAM_CHUNK_BYTES = 64 * 1024
+SPILL_PREFIX = 'audit_trail_'
+_SPILL_MAX_AGE_SECONDS = 24 * 3600  # Spilled bodies left behind by ended sessions
+# Bodies that are not an audit trail list are parsed whole only up to this size
+MAX_INLINE_BYTES = 5 * 1024 * 1024
+
+
+class AuditTrailError(Exception):
+    """An audit trail page could not be fetched"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AuditCall(NamedTuple):
+    """Timing of one audit trail request"""
+    page: object
+    status_code: int
+    seconds: float  # Whole call: retries, download and JSON parsing
+    server_seconds: float  # Until the response headers arrived, including retries
+    retries: int
+    wire_bytes: int  # As sent by the server, compressed if it used gzip (0 when unknown)
+    body_bytes: int
+    source: str = LEADER  # Or served by an identical call in flight ('shared') or just made ('cache')
+
+
+_sessions = {}
+_gates = {}
+_sessions_lock = threading.Lock()
+
+
+class RateLimiter:
+    """Token bucket: on average `rate` acquisitions per second, bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Take the token now, possibly going negative, and sleep off the debt outside the lock
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class _HostGate:
+    """Concurrency cap and rate limit shared by every request to one host"""
+
+    def __init__(self):
+        self.slots = threading.BoundedSemaphore(max(1, AUDIT_HOST_CONCURRENCY))
+        self.limiter = RateLimiter(AUDIT_HOST_RATE)
+
+
+def _new_session():
+    # Retries happen in `_send`, under the host's gate, rather than inside urllib3
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(AUDIT_FETCH_WORKERS, 10))
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip, deflate",
+        "Content-Type": "application/json"
+    })
+    return session
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return parts.scheme, parts.netloc
+
+
+def get_session(url):
+    """
+    Process-wide session for the host of `url`.
+
+    Keeping one per host reuses TCP and TLS connections across requests,
+    pages and Streamlit sessions instead of handshaking for every call.
+    """
+    key = _host_key(url)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = _new_session()
+    return session
+
+
+def _get_gate(url):
+    key = _host_key(url)
+    gate = _gates.get(key)
+    if gate is None:
+        with _sessions_lock:
+            gate = _gates.get(key)
+            if gate is None:
+                gate = _gates[key] = _HostGate()
+    return gate
+
+
+class _Sent(NamedTuple):
+    """Final response of `_send` and how it was reached"""
+    response: requests.Response
+    gate: _HostGate
+    retries: int
+    server_seconds: float  # Until the final response headers arrived, including retries and backoff
+
+
+def _retry_delay(response, retries):
+    """Seconds to wait before the next attempt: Retry-After if the server sent one, else exponential backoff"""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return AUDIT_RETRY_BACKOFF * (2 ** retries)
+
+
+def _send(url, token, body, timeout, stream=False):
+    """
+    POST through the host's gate and pooled session, retrying 429 and 5xx
+    responses and connection errors up to AUDIT_MAX_RETRIES times.
+
+    Every attempt takes its own slot and rate-limit token, and no slot is
+    held while backing off. A streamed body keeps its slot until read.
+    """
+    gate = _get_gate(url)
+    session = get_session(url)
+    start = time.perf_counter()
+    retries = 0
+    while True:
+        gate.slots.acquire()
+        attempt_start = time.perf_counter()
+        try:
+            gate.limiter.acquire()
+            response = session.post(url, headers={"Authorization": f"Bearer {token}"}, json=body,
+                                    timeout=timeout, stream=stream)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            gate.slots.release()
+            if retries >= AUDIT_MAX_RETRIES:
+                raise
+            response = None
+        except BaseException:
+            gate.slots.release()
+            raise
+        else:
+            # Audit trail queries only read, so retrying the POST is safe
+            if response.status_code not in RETRY_STATUSES or retries >= AUDIT_MAX_RETRIES:
+                if not stream:
+                    gate.slots.release()
+                server_seconds = attempt_start - start + response.elapsed.total_seconds()
+                return _Sent(response, gate, retries, server_seconds)
+            response.close()
+            gate.slots.release()
+        time.sleep(_retry_delay(response, retries))
+        retries += 1
+
+
+def _record_call(body, sent, start, body_bytes):
+    return AuditCall(
+        page=body.get("page") if isinstance(body, dict) else None,
+        status_code=sent.response.status_code,
+        seconds=time.perf_counter() - start,
+        server_seconds=sent.server_seconds,
+        retries=sent.retries,
+        wire_bytes=int(sent.response.headers.get("Content-Length") or 0),
+        body_bytes=body_bytes
+    )
+
+
+def _retain_result(result):
+    data = result[1]
+    if isinstance(data, dict) and isinstance(data.get("data"), AuditEventStore):
+        data["data"].retain()
+
+
+def _release_result(result):
+    data = result[1]
+    if isinstance(data, dict) and isinstance(data.get("data"), AuditEventStore):
+        data["data"].close()
+
+
+# Identical requests (same URL, body and token) in flight at once go upstream once
+audit_flights = SingleFlight(AUDIT_RESULT_TTL, share=_retain_result, release=_release_result)
+
+
+def _deduplicated(kind, url, token, body, run, timings, fresh=False):
+    """
+    Run a request through `audit_flights`, keyed by URL, body and token.
+
+    The token only enters the key as a hash, and only 2xx results are
+    cached for AUDIT_RESULT_TTL seconds.
+    """
+    key = (
+        kind,
+        url,
+        hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode('utf-8')).hexdigest(),
+        hashlib.sha256(token.encode('utf-8')).hexdigest()
+    )
+    start = time.perf_counter()
+    (status_code, data, call), source = audit_flights.do(key, run, cacheable=lambda r: 200 <= r[0] < 300,
+                                                         use_cache=not fresh)
+    if source != LEADER:
+        call = call._replace(seconds=time.perf_counter() - start, server_seconds=0.0, retries=0, wire_bytes=0,
+                             source=source)
+    if timings is not None:
+        timings.append(call)
+    return status_code, data
+
+
+def post_audit_trail(url, token, body, timeout=AUDIT_REQUEST_TIMEOUT, timings=None, fresh=False):
+    """
+    Send one audit trail request over the host's pooled session.
+
+    At most AUDIT_HOST_CONCURRENCY requests per host are in flight and they
+    start at no more than AUDIT_HOST_RATE per second, however many pages,
+    records and sessions are fetching at once. 429 and 5xx responses are
+    retried with exponential backoff (AUDIT_MAX_RETRIES, AUDIT_RETRY_BACKOFF),
+    honouring Retry-After; retries count against the same limits.
+
+    Args:
+        timings: Optional list the call's AuditCall is appended to
+        fresh: Skip results cached from an identical recent request
+
+    Returns:
+        Tuple of (status code, parsed JSON body or the raw text); the body may
+        be shared with other callers and must not be modified
+    """
+    def run():
+        start = time.perf_counter()
+        sent = _send(url, token, body, timeout)
+        response = sent.response
+        try:
+            data = response.json()
+        except ValueError:
+            data = response.text
+        return response.status_code, data, _record_call(body, sent, start, len(response.content))
+
+    return _deduplicated('json', url, token, body, run, timings, fresh)
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+
+class _DataArrayScanner:
+    """
+    Incremental parser for a `{"data": [{...}, ...], ...}` body (or a bare array of events).
+
+    Only the outer object and the data array are walked here; each member
+    value and each event is decoded by `json` in one call as soon as it is
+    complete, so memory is bounded by the largest event rather than the body.
+    Events are reported with their byte range in the body.
+    """
+
+    def __init__(self, on_event):
+        self.on_event = on_event
+        self.meta = {}
+        self.found_data = False
+        self.complete = False
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._text = ''
+        self._pos = 0  # Next character to parse in _text
+        self._offset = 0  # Body byte offset of _text[_pos]
+        self._state = 'start'
+        self._in_object = False
+        self._key = None
+        self._retry_at = 0  # An incomplete value is retried once _text is this long
+
+    def feed(self, chunk, final=False):
+        """Parse a chunk of the body; raises ValueError if the body is not JSON of this shape"""
+        self._text = self._text[self._pos:] + self._utf8.decode(chunk, final)
+        self._retry_at -= self._pos
+        self._pos = 0
+        if final or len(self._text) >= self._retry_at:
+            self._parse(final)
+
+    def finish(self):
+        self.feed(b'', final=True)
+
+    def _advance(self, end):
+        self._offset += len(self._text[self._pos:end].encode('utf-8'))
+        self._pos = end
+
+    def _decode(self, final):
+        """Decode the value at _pos, or None until it is complete"""
+        try:
+            value, end = _decoder.raw_decode(self._text, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            # Wait for the buffer to double so a large value is not re-decoded per chunk
+            self._retry_at = max(2 * len(self._text), len(self._text) + STREAM_CHUNK_BYTES)
+            return None
+        if end == len(self._text) and not final and not isinstance(value, (str, dict, list)):
+            return None  # A number may continue in the next chunk
+        return value, end
+
+    def _parse(self, final):
+        text = self._text
+        while self._state != 'done':
+            pos = _WHITESPACE.match(text, self._pos).end()
+            self._offset += pos - self._pos
+            self._pos = pos
+            if pos >= len(text):
+                if final:
+                    raise ValueError("Body ended early")
+                return
+            char = text[pos]
+            state = self._state
+
+            if state == 'start':
+                if char == '{':
+                    self._in_object = True
+                    self._state = 'key'
+                elif char == '[':
+                    self.found_data = True
+                    self._state = 'element'
+                else:
+                    raise ValueError("Body is not an object or array")
+                self._advance(pos + 1)
+            elif state == 'key':
+                if char == '}':
+                    self._advance(pos + 1)
+                    self.complete = True
+                    self._state = 'done'
+                    continue
+                if char != '"':
+                    raise ValueError("Expected a member name")
+                decoded = self._decode(final)
+                if decoded is None:
+                    return
+                self._key = decoded[0]
+                self._advance(decoded[1])
+                self._state = 'colon'
+            elif state == 'colon':
+                if char != ':':
+                    raise ValueError("Expected ':'")
+                self._advance(pos + 1)
+                self._state = 'value'
+            elif state == 'value':
+                if self._key == 'data' and char == '[':
+                    self.found_data = True
+                    self._advance(pos + 1)
+                    self._state = 'element'
+                    continue
+                decoded = self._decode(final)
+                if decoded is None:
+                    return
+                self.meta[self._key] = decoded[0]
+                self._advance(decoded[1])
+                self._state = 'next_member'
+            elif state == 'next_member':
+                if char not in ',}':
+                    raise ValueError("Expected ',' or '}'")
+                self._advance(pos + 1)
+                if char == ',':
+                    self._state = 'key'
+                else:
+                    self.complete = True
+                    self._state = 'done'
+            elif state in ('element', 'next_element'):
+                if char == ']':
+                    self._advance(pos + 1)
+                    if self._in_object:
+                        self._state = 'next_member'
+                    else:
+                        self.complete = True
+                        self._state = 'done'
+                elif state == 'next_element':
+                    if char != ',':
+                        raise ValueError("Expected ',' or ']'")
+                    self._advance(pos + 1)
+                    self._state = 'element'
+                else:
+                    decoded = self._decode(final)
+                    if decoded is None:
+                        return
+                    start = self._offset
+                    self._advance(decoded[1])
+                    if isinstance(decoded[0], dict):
+                        self.on_event(start, self._offset, decoded[0])
+                    self._state = 'next_element'
+
+
+def _purge_spill_files():
+    cutoff = time.time() - _SPILL_MAX_AGE_SECONDS
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{SPILL_PREFIX}*.json")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def stream_audit_trail(url, token, body, timeout=AUDIT_REQUEST_TIMEOUT, timings=None):
+    """
+    Send one audit trail request and stream its body to a temp file.
+
+    The events of the `data` array are indexed into an AuditEventStore as
+    the body arrives, so neither the body nor the parsed events are held in
+    memory. Bodies of another shape (errors, plain text) are parsed whole up
+    to MAX_INLINE_BYTES, otherwise only their beginning is returned.
+
+    Identical concurrent requests share one download; every caller holds the
+    store and must `close()` it when done.
+
+    Returns:
+        Tuple of (status code, data) where data is the body's other top-level
+        members plus 'data' as an AuditEventStore, or the parsed JSON or text
+    """
+    return _deduplicated('stream', url, token, body, lambda: _stream(url, token, body, timeout), timings)
+
+
+def _stream(url, token, body, timeout):
+    _purge_spill_files()
+    start = time.perf_counter()
+    sent = _send(url, token, body, timeout, stream=True)
+    response = sent.response
+    body_bytes = 0
+    try:
+        with tempfile.NamedTemporaryFile(prefix=SPILL_PREFIX, suffix='.json', delete=False) as spill:
+            store = AuditEventStore(spill.name)
+            scanner = _DataArrayScanner(store.append)
+            try:
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK_BYTES):
+                    spill.write(chunk)
+                    body_bytes += len(chunk)
+                    if scanner is not None:
+                        try:
+                            scanner.feed(chunk)
+                        except ValueError:
+                            # Not JSON after all; keep spilling for the fallback below
+                            scanner = None
+                if scanner is not None:
+                    try:
+                        scanner.finish()
+                    except ValueError:
+                        scanner = None
+            except BaseException:
+                store.close()
+                raise
+    finally:
+        response.close()
+        sent.gate.slots.release()
+    call = _record_call(body, sent, start, body_bytes)
+
+    if scanner is not None and scanner.found_data and scanner.complete:
+        return response.status_code, {**scanner.meta, "data": store}, call
+
+    if body_bytes <= MAX_INLINE_BYTES:
+        text = store.read_raw(0, body_bytes)
+        store.close()
+        try:
+            return response.status_code, json.loads(text), call
+        except ValueError:
+            return response.status_code, text, call
+    text = store.read_raw(0, STREAM_CHUNK_BYTES)
+    store.close()
+    return response.status_code, f"{text}\n... ({body_bytes:,} bytes, truncated)", call
+
+
+def _page_limit(limit):
+    """`limit` capped at MAX_PAGE_LIMIT; ValueError unless it is a positive integer"""
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        raise ValueError(f"limit must be a positive integer, got {limit!r}")
+    return min(limit, MAX_PAGE_LIMIT)
+
+
+def _fetch_page(url, token, body, page, limit, timings=None, fresh=False):
+    status_code, data = post_audit_trail(url, token, {**body, "page": page, "limit": limit}, timings=timings,
+                                         fresh=fresh)
+    if not 200 <= status_code < 300:
+        raise AuditTrailError(f"Page {page} failed with status {status_code}", status_code)
+    if not isinstance(data, dict) or not isinstance(data.get("data"), list):
+        raise AuditTrailError(f"Page {page} did not return a list of records", status_code)
+    return data
+
+
+def _find_total(data):
+    """The total number of events reported by a response, if any"""
+    for container in (data, data.get("meta"), data.get("pagination")):
+        if isinstance(container, dict):
+            for key in _TOTAL_KEYS:
+                value = container.get(key)
+                if isinstance(value, int) and not isinstance(value, bool):
+                    return value
+    return None
+
+
+def merge_events(pages, descending=True):
+    """
+    Merge pages of events into one list ordered by timestamp.
+
+    Events seen on more than one page (pages shift while new events arrive)
+    are kept once, by `id`; events without an id are all kept.
+    """
+    merged = {}
+    anonymous = []
+    for events in pages:
+        for event in events:
+            event_id = event.get("id") if isinstance(event, dict) else None
+            if event_id is None:
+                anonymous.append(event)
+            else:
+                merged.setdefault(event_id, event)
+
+    events = list(merged.values()) + anonymous
+    events.sort(key=event_timestamp, reverse=descending)
+    return events
+
+
+def fetch_all_audit_events(url, token, body, limit=MAX_PAGE_LIMIT, workers=AUDIT_FETCH_WORKERS, on_progress=None,
+                           timings=None):
+    """
+    Fetch every page of an audit trail query.
+
+    Page 1 is fetched first. If it reports a total, all remaining pages are
+    requested at once on a pool of `workers` threads; otherwise pages are
+    requested `workers` at a time until one comes back short or empty, or
+    repeats the page before it (the server ignores paging).
+
+    Args:
+        body: Request body; its page and limit are replaced per request
+        on_progress: Optional callback(pages_done, pages_total or None, events_so_far),
+            always called from the calling thread
+        timings: Optional list each request's AuditCall is appended to
+
+    Returns:
+        Dict with the merged 'data' list, 'pages' fetched, reported 'total' and 'elapsed' seconds
+
+    Raises:
+        ValueError if `limit` is not a positive integer
+        AuditTrailError or requests.exceptions.RequestException if any page fails
+    """
+    start = time.perf_counter()
+    descending = (body.get("sort") or {}).get("timestamp", -1) == -1
+    limit = _page_limit(limit)
+
+    first = _fetch_page(url, token, body, 1, limit, timings)
+    pages = {1: first["data"]}
+    total = _find_total(first)
+    page_count = max(1, math.ceil(total / limit)) if total is not None else None
+
+    def report():
+        if on_progress:
+            on_progress(len(pages), page_count, sum(len(events) for events in pages.values()))
+
+    report()
+
+    if len(first["data"]) >= limit and page_count != 1:
+        executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        try:
+            if page_count is not None:
+                futures = {
+                    executor.submit(_fetch_page, url, token, body, page, limit, timings): page
+                    for page in range(2, min(page_count, _MAX_PAGES) + 1)
+                }
+                for future in as_completed(futures):
+                    pages[futures[future]] = future.result()["data"]
+                    report()
+            else:
+                next_page = 2
+                done = False
+                while not done and next_page <= _MAX_PAGES:
+                    wave = range(next_page, next_page + max(1, workers))
+                    results = executor.map(lambda page: _fetch_page(url, token, body, page, limit, timings), wave)
+                    for page, data in zip(wave, results):
+                        events = data["data"]
+                        if events == pages[page - 1]:
+                            # Same page again: the server ignores paging
+                            done = True
+                            break
+                        pages[page] = events
+                        report()
+                        if len(events) < limit:
+                            # A short or empty page is the last one
+                            done = True
+                            break
+                    next_page += max(1, workers)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    ordered = [pages[page] for page in sorted(pages)]
+    return {
+        "data": merge_events(ordered, descending=descending),
+        "pages": len(pages),
+        "total": total,
+        "elapsed": time.perf_counter() - start
+    }
+
+
+def fetch_audit_events_since(url, token, body, since, limit=MAX_PAGE_LIMIT, on_progress=None, timings=None):
+    """
+    Fetch only the events at or after `since` (ms), newest first. Events at
+    exactly `since` are included because several events can share a timestamp.
+
+    The API cannot filter by time, so pages are read newest first and paging
+    stops at the first page reaching an event older than `since`; a record
+    with no new activity costs one request.
+
+    Returns:
+        Dict with the recent events as 'data', 'pages' fetched and 'elapsed' seconds
+    """
+    start = time.perf_counter()
+    body = {**body, "sort": {**(body.get("sort") or {}), "timestamp": -1}}
+    limit = _page_limit(limit)
+    pages = []
+    fresh = []
+
+    for page in range(1, _MAX_PAGES + 1):
+        # A sync asks what is new now, so it never reuses a cached page
+        events = _fetch_page(url, token, body, page, limit, timings, fresh=True)["data"]
+        pages.append(events)
+        newer = [e for e in events if isinstance(e, dict) and event_timestamp(e) >= since]
+        fresh.extend(newer)
+        if on_progress:
+            on_progress(page, None, len(fresh))
+        if len(events) < limit or len(newer) < len(events):
+            break
+
+    return {
+        "data": merge_events([fresh]),
+        "pages": len(pages),
+        "elapsed": time.perf_counter() - start
+    }
+
+
+def sync_audit_events(url, token, form_data_id, record_id, body, limit=MAX_PAGE_LIMIT, on_progress=None,
+                      timings=None):
+    """
+    Bring the local cache of a record's audit trail up to date.
+
+    A record that was never cached is fetched in full; otherwise only events
+    newer than the latest cached one are requested.
+
+    Returns:
+        Dict with 'added' events, 'pages' fetched, 'elapsed' seconds and whether it was a 'full' fetch
+    """
+    from src.utils.database import db
+
+    latest = db.get_latest_audit_timestamp(form_data_id, record_id)
+    if latest is None:
+        result = fetch_all_audit_events(url, token, body, limit=limit, on_progress=on_progress, timings=timings)
+    else:
+        result = fetch_audit_events_since(url, token, body, latest, limit=limit, on_progress=on_progress,
+                                          timings=timings)
+
+    return {
+        "added": db.save_audit_events(form_data_id, record_id, result["data"]),
+        "pages": result["pages"],
+        "elapsed": result["elapsed"],
+        "full": latest is None
+    }
+
+
+_PAIR_SPLIT = re.compile(r'[\s,;]+')
+
+
+def parse_record_pairs(text):
+    """
+    Read (form_data_id, record_id) pairs from pasted text or CSV.
+
+    A CSV with form_data_id and record_id columns is read by header; any
+    other input is read as one pair per line, separated by commas, tabs,
+    semicolons or spaces. Repeated pairs are kept once.
+
+    Returns:
+        Tuple of (pairs in input order, list of unreadable line descriptions)
+    """
+    pairs = {}
+    errors = []
+    lines = text.splitlines()
+    header = [h.strip().lower() for h in next(csv.reader([lines[0]]), [])] if lines else []
+
+    if 'form_data_id' in header and 'record_id' in header:
+        for row_no, row in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+            row = {(k or '').strip().lower(): (v or '').strip() for k, v in row.items()}
+            if row.get('form_data_id') and row.get('record_id'):
+                pairs.setdefault((row['form_data_id'], row['record_id']), None)
+            elif any(row.values()):
+                errors.append(f"Row {row_no}: missing form_data_id or record_id")
+        return list(pairs), errors
+
+    for line_no, line in enumerate(lines, start=1):
+        parts = [part for part in _PAIR_SPLIT.split(line.strip()) if part]
+        if not parts:
+            continue
+        if len(parts) != 2:
+            errors.append(f"Line {line_no}: expected form_data_id and record_id, got {line.strip()[:80]}")
+            continue
+        pairs.setdefault((parts[0], parts[1]), None)
+    return list(pairs), errors
+
+
+def fetch_many_audit_trails(url, token, pairs, body=None, limit=MAX_PAGE_LIMIT, workers=AUDIT_BATCH_WORKERS,
+                            on_progress=None, timings=None):
+    """
+    Fetch the full audit trail of many records concurrently.
+
+    Records are spread over `workers` threads and each record's pages are
+    fetched in turn; the per-host gate in `post_audit_trail` caps the load on
+    the API. A failing record is collected and the run continues.
+
+    Args:
+        pairs: (form_data_id, record_id) pairs
+        body: Request body template (sort and any extra filters); form_data_id
+            and filter.record_id are set per record
+        on_progress: Optional callback(records_done, records_total, failures),
+            always called from the calling thread
+
+    Returns:
+        Dict with 'data' (every event, tagged with its form_data_id and
+        record_id, newest first), 'failures' ([{form_data_id, record_id, error}]),
+        'records' fetched and 'elapsed' seconds
+    """
+    start = time.perf_counter()
+    body = body or {"sort": {"timestamp": -1}}
+    descending = (body.get("sort") or {}).get("timestamp", -1) == -1
+
+    def fetch_one(form_data_id, record_id):
+        record_body = {
+            **body,
+            "form_data_id": form_data_id,
+            "filter": {**(body.get("filter") or {}), "record_id": record_id}
+        }
+        result = fetch_all_audit_events(url, token, record_body, limit=limit, workers=1, timings=timings)
+        return [
+            {**event, "form_data_id": form_data_id, "record_id": record_id}
+            for event in result["data"] if isinstance(event, dict)
+        ]
+
+    events = []
+    failures = []
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(fetch_one, *pair): pair for pair in pairs}
+        for future in as_completed(futures):
+            form_data_id, record_id = futures[future]
+            try:
+                events.extend(future.result())
+            except Exception as e:
+                failures.append({"form_data_id": form_data_id, "record_id": record_id, "error": str(e)})
+            done += 1
+            if on_progress:
+                on_progress(done, len(futures), len(failures))
+
+    # Events are already unique per record; only order them
+    events.sort(key=event_timestamp, reverse=descending)
+    return {
+        "data": events,
+        "failures": failures,
+        "records": len(pairs) - len(failures),
+        "elapsed": time.perf_counter() - start
+    }
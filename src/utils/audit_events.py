@@ -0,0 +1,454 @@
+"""Event store, tabular views, field-level diffs and history of audit trail events"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import NamedTuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import numpy as np
+import pandas as pd
+from dateutil import tz
+
+# Event fields kept out of the flattened metadata
+DATA_FIELDS = ('new_data', 'old_data', 'columns')
+MISSING = object()  # A field absent on one side of a change
+CHECKPOINT_EVERY = 64  # Events between full-state checkpoints of a RecordHistory
+STORE_CACHE_EVENTS = 200  # Full events an AuditEventStore keeps parsed
+_TOUCH_INTERVAL_SECONDS = 3600  # How often a store in use refreshes its spill file's mtime
+
+
+class FieldChange(NamedTuple):
+    """One changed leaf field of an event, e.g. path 'additional_info.note'"""
+    path: str
+    old: object  # MISSING if the field was added
+    new: object  # MISSING if the field was removed
+
+    @property
+    def kind(self):
+        if self.old is MISSING:
+            return 'added'
+        if self.new is MISSING:
+            return 'removed'
+        return 'changed'
+
+
+@lru_cache(maxsize=1)
+def _local_timezone():
+    """
+    The system time zone with its DST rules, as `datetime.fromtimestamp`
+    applies them, rather than today's UTC offset.
+
+    A named zone (from TZ or the /etc/localtime link) converts a whole
+    column at once; dateutil's tzlocal is the slower fallback.
+    """
+    name = os.environ.get('TZ', '').lstrip(':')
+    if not name:
+        link = os.path.realpath('/etc/localtime')
+        name = link.split('/zoneinfo/', 1)[1] if '/zoneinfo/' in link else ''
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return tz.tzlocal()
+
+
+def event_timestamp(event, default=0):
+    """An event's millisecond timestamp as an int, `default` if it is missing or not a number"""
+    value = event.get('timestamp') if isinstance(event, dict) else None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return default
+
+
+def _event_columns(event):
+    """Flattenable metadata, automation_id and changed columns of one event"""
+    if not isinstance(event, dict):
+        event = {}
+    new_data = event.get('new_data')
+    columns = event.get('columns')
+    return (
+        {k: v for k, v in event.items() if k not in DATA_FIELDS},
+        (new_data.get('automation_id') or '') if isinstance(new_data, dict) else '',
+        list(columns) if isinstance(columns, (list, tuple)) else []
+    )
+
+
+def _build_frame(metadata, automation_ids, changed):
+    frame = pd.json_normalize(metadata, sep='.') if metadata else pd.DataFrame()
+    frame.index = pd.RangeIndex(len(metadata))
+    for column in ('id', 'action', 'name', 'email'):
+        if column not in frame:
+            frame[column] = ''
+        frame[column] = frame[column].fillna('').astype(str)
+    frame['automation_id'] = pd.Series(automation_ids, dtype=str)
+    frame['columns'] = pd.Series(changed, dtype=object)
+
+    timestamps = pd.to_numeric(frame['timestamp'], errors='coerce') if 'timestamp' in frame else \
+        pd.Series(np.nan, index=frame.index)
+    frame['timestamp'] = timestamps
+    frame['time'] = pd.to_datetime(timestamps, unit='ms', utc=True).dt.tz_convert(_local_timezone()).dt.tz_localize(None)
+    return frame
+
+
+def events_to_frame(events):
+    """
+    Build a DataFrame with one row per event, in the order given.
+
+    Top-level metadata is flattened (nested objects become dotted columns)
+    while new_data/old_data stay out; `automation_id` is lifted from new_data
+    and `time` is converted from the millisecond `timestamp` in one vectorized
+    step, in local time like the rest of the page.
+
+    The row index is the event's position in `events`.
+    """
+    if isinstance(events, AuditEventStore):
+        return events.to_frame()
+    metadata, automation_ids, changed = [], [], []
+    for event in events:
+        event_metadata, automation_id, columns = _event_columns(event)
+        metadata.append(event_metadata)
+        automation_ids.append(automation_id)
+        changed.append(columns)
+    return _build_frame(metadata, automation_ids, changed)
+
+
+class AuditEventStore(Sequence):
+    """
+    Events of a response body spilled to a file.
+
+    Only the metadata columns of each event and its byte range in the file
+    are kept in memory; full events (with new_data and old_data) are read
+    back from the file when shown, with a small cache for reruns. Behaves as
+    a read-only list of events.
+
+    A store can be shared by several sessions: each extra holder calls
+    `retain()`, and the file is deleted when the last holder calls `close()`.
+    Reading the store keeps the file's mtime recent, so the purge of spill
+    files left behind by ended sessions does not take it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._holders = 1
+        self._starts = array('Q')
+        self._ends = array('Q')
+        self._metadata = []
+        self._automation_ids = []
+        self._changed = []
+        self._cache = OrderedDict()
+        self._frame = None
+        self._touched = time.time()
+
+    def _open(self):
+        f = open(self.path, 'rb')
+        now = time.time()
+        if now - self._touched > _TOUCH_INTERVAL_SECONDS:
+            self._touched = now
+            os.utime(self.path)
+        return f
+
+    def exists(self):
+        """False once the spill file is gone (closed, or removed from the temp directory)"""
+        return os.path.exists(self.path)
+
+    def append(self, start, end, event):
+        """Index an event found at bytes [start, end) of the file"""
+        metadata, automation_id, columns = _event_columns(event)
+        self._starts.append(start)
+        self._ends.append(end)
+        self._metadata.append(metadata)
+        self._automation_ids.append(automation_id)
+        self._changed.append(columns)
+        self._frame = None
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        with self._lock:
+            event = self._cache.get(index)
+            if event is not None:
+                self._cache.move_to_end(index)
+                return event
+        with self._open() as f:
+            f.seek(self._starts[index])
+            event = json.loads(f.read(self._ends[index] - self._starts[index]))
+        with self._lock:
+            self._cache[index] = event
+            if len(self._cache) > STORE_CACHE_EVENTS:
+                self._cache.popitem(last=False)
+        return event
+
+    def __iter__(self):
+        # One sequential pass over the file instead of a seek per event
+        with self._open() as f:
+            for start, end in zip(self._starts, self._ends):
+                f.seek(start)
+                yield json.loads(f.read(end - start))
+
+    def to_frame(self):
+        """The events DataFrame, built from the in-memory columns only"""
+        if self._frame is None:
+            self._frame = _build_frame(self._metadata, self._automation_ids, self._changed)
+        return self._frame
+
+    def read_raw(self, offset=0, size=64 * 1024):
+        """Up to `size` bytes of the raw body from `offset`, decoded for display"""
+        with self._open() as f:
+            f.seek(offset)
+            return f.read(size).decode('utf-8', errors='replace')
+
+    @property
+    def size(self):
+        """Bytes of the spilled body"""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def retain(self):
+        """Register another holder of the store"""
+        with self._lock:
+            self._holders += 1
+
+    def close(self):
+        """Release this holder; the last one deletes the spilled body, after which the store cannot be read"""
+        with self._lock:
+            self._holders -= 1
+            if self._holders > 0:
+                return
+            self._cache.clear()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def changed_columns_frame(frame):
+    """One row per (event, changed column), from exploding the `columns` lists"""
+    exploded = frame[['columns']].explode('columns').dropna()
+    return exploded.rename(columns={'columns': 'column'})
+
+
+def filter_events(frame, actions=None, emails=None, automation_ids=None, columns=None, start=None, end=None):
+    """
+    Positions of the events matching every given filter, in frame order.
+
+    Args:
+        actions, emails, automation_ids: Keep events whose value is one of these
+        columns: Keep events that changed at least one of these columns
+        start, end: Inclusive time range (datetimes in local time)
+
+    Returns:
+        NumPy array of row positions
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    if actions:
+        mask &= frame['action'].isin(actions).to_numpy()
+    if emails:
+        mask &= frame['email'].isin(emails).to_numpy()
+    if automation_ids:
+        mask &= frame['automation_id'].isin(automation_ids).to_numpy()
+    if start is not None:
+        mask &= (frame['time'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (frame['time'] <= pd.Timestamp(end)).to_numpy()
+    if columns:
+        exploded = changed_columns_frame(frame)
+        hits = exploded.index[exploded['column'].isin(columns)].unique()
+        column_mask = np.zeros(len(frame), dtype=bool)
+        column_mask[hits.to_numpy(dtype=np.int64)] = True
+        mask &= column_mask
+    return np.flatnonzero(mask)
+
+
+def _resolve(data, path):
+    """Value at a dotted path inside nested objects, or MISSING"""
+    if not isinstance(data, dict):
+        return MISSING
+    if path in data:
+        return data[path]
+    head, _, rest = path.partition('.')
+    if rest and isinstance(data.get(head), dict):
+        return _resolve(data[head], rest)
+    return MISSING
+
+
+def _diff_values(path, old, new, changes):
+    if old == new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        # Walk both objects with a stack instead of recursion
+        stack = [(path, old, new)]
+        while stack:
+            prefix, old_obj, new_obj = stack.pop()
+            for key in old_obj.keys() | new_obj.keys():
+                old_value = old_obj.get(key, MISSING)
+                new_value = new_obj.get(key, MISSING)
+                if old_value == new_value:
+                    continue
+                child = f"{prefix}.{key}" if prefix else str(key)
+                if isinstance(old_value, dict) and isinstance(new_value, dict):
+                    stack.append((child, old_value, new_value))
+                else:
+                    changes.append(FieldChange(child, old_value, new_value))
+        return
+    changes.append(FieldChange(path, old, new))
+
+
+def diff_event(event):
+    """
+    Field-level changes between an event's old_data and new_data.
+
+    The event's `columns` are used as a hint: only those paths are compared,
+    with dotted names such as `additional_info.note` resolved into nested
+    objects. Events without `columns` are compared in full. Unchanged
+    fields are skipped and nested objects are reported leaf by leaf.
+
+    Returns:
+        List of FieldChange in path order
+    """
+    old_data = event.get('old_data') if isinstance(event.get('old_data'), dict) else {}
+    new_data = event.get('new_data') if isinstance(event.get('new_data'), dict) else {}
+    changes = []
+
+    columns = event.get('columns')
+    if isinstance(columns, (list, tuple)) and columns:
+        for path in dict.fromkeys(str(column) for column in columns):
+            old, new = _resolve(old_data, path), _resolve(new_data, path)
+            if old is MISSING and new is MISSING:
+                continue
+            _diff_values(path, old, new, changes)
+    else:
+        _diff_values('', old_data, new_data, changes)
+
+    # A column may be both listed and nested in another listed column
+    unique = {change.path: change for change in changes}
+    return [unique[path] for path in sorted(unique)]
+
+
+class FieldVersion(NamedTuple):
+    """A value a field took, and the event that set it"""
+    timestamp: int
+    value: object  # MISSING if the event removed the field
+    name: str
+    email: str
+    automation_id: str
+    event_id: object
+
+
+def flatten_data(data, prefix=''):
+    """Leaf values of nested objects keyed by dotted path; lists are leaves"""
+    flat = {}
+    stack = [(prefix, data)]
+    while stack:
+        path, value = stack.pop()
+        if isinstance(value, dict) and (value or not path):
+            stack.extend((f"{path}.{key}" if path else str(key), child) for key, child in value.items())
+        elif path:
+            flat[path] = value
+    return flat
+
+
+def _apply(state, path, value):
+    """Set a dotted path in a flat state, replacing whatever was at or below it"""
+    prefix = path + '.'
+    for key in [key for key in state if key == path or key.startswith(prefix)]:
+        del state[key]
+    if value is MISSING:
+        return
+    if isinstance(value, dict) and value:
+        state.update(flatten_data(value, path))
+    else:
+        state[path] = value
+
+
+class RecordHistory:
+    """
+    Per-field change index and point-in-time states of one record.
+
+    Events are replayed once, oldest first. Each field keeps the ordered
+    versions it took, and every `checkpoint_every` events a copy of the full
+    state is kept, so the state at any time is the nearest earlier
+    checkpoint plus at most `checkpoint_every` deltas instead of a replay of
+    the whole history.
+    """
+
+    def __init__(self, events, checkpoint_every=CHECKPOINT_EVERY):
+        ordered = sorted((e for e in events if isinstance(e, dict)), key=event_timestamp)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.timestamps = []
+        self.fields = {}
+        self._field_timestamps = {}  # Field -> timestamps of its versions, for bisecting
+        self._deltas = []
+        self._checkpoints = []
+
+        state = flatten_data(ordered[0].get('old_data') or {}) if ordered else {}
+        for n, event in enumerate(ordered):
+            if n % self.checkpoint_every == 0:
+                self._checkpoints.append(dict(state))
+
+            timestamp = event_timestamp(event)
+            new_data = event.get('new_data') if isinstance(event.get('new_data'), dict) else {}
+            changes = [(change.path, change.new) for change in diff_event(event)]
+            for path, value in changes:
+                _apply(state, path, value)
+                versions = [(path, value)] if not isinstance(value, dict) or not value else \
+                    list(flatten_data(value, path).items())
+                for field, field_value in versions:
+                    self.fields.setdefault(field, []).append(FieldVersion(
+                        timestamp, field_value, str(event.get('name') or ''), str(event.get('email') or ''),
+                        str(new_data.get('automation_id') or ''), event.get('id')
+                    ))
+                    self._field_timestamps.setdefault(field, []).append(timestamp)
+            self.timestamps.append(timestamp)
+            self._deltas.append(changes)
+
+        self._final = state
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def field_history(self, path):
+        """Versions of a field, oldest first"""
+        return self.fields.get(path, [])
+
+    def value_at(self, path, timestamp):
+        """The version of a field in effect at `timestamp` (ms), or None if it had not been set yet"""
+        versions = self.fields.get(path, [])
+        pos = bisect.bisect_right(self._field_timestamps.get(path, []), timestamp)
+        return versions[pos - 1] if pos else None
+
+    def state_at(self, timestamp):
+        """
+        The record as of `timestamp` (ms): every event at or before it applied.
+
+        Returns:
+            Dict of dotted field path -> value
+        """
+        applied = bisect.bisect_right(self.timestamps, timestamp)
+        if applied == len(self.timestamps):
+            return dict(self._final)
+        if not self._checkpoints:
+            return {}
+        checkpoint = min(applied // self.checkpoint_every, len(self._checkpoints) - 1)
+        state = dict(self._checkpoints[checkpoint])
+        for changes in self._deltas[checkpoint * self.checkpoint_every:applied]:
+            for path, value in changes:
+                _apply(state, path, value)
+        return state
@@ -1,21 +1,122 @@
 """Database operations and connection management"""
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-from src.models.component import Base, Component, Category, ChangeType, ApiRequest
+from sqlalchemy import (
+    create_engine, inspect, func, literal, text, select, insert, update, delete, and_, or_, case, cast, DateTime
+)
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import sessionmaker, aliased
+from datetime import datetime, timedelta
+import hashlib
+import json
+import logging
+import uuid
+from src.models.component import (
+    Base, Component, Category, ChangeType, ApiRequest, ComponentReference, ImportStagingRow, ImportStatus,
+    ImportJob, ImportJobStatus, AuditEvent
+)
 from src.config import get_database_url
+from src.utils.audit_events import event_timestamp
+
+logger = logging.getLogger(__name__)
+
+COMPONENT_COLUMNS = [
+    'uid', 'component_id', 'name', 'url_link', 'change_type',
+    'description', 'category', 'type', 'created_at', 'updated_at'
+]
+
+
+def _import_status(status):
+    """An ImportStatus cast to the column's enum type, so a CASE of them is assignable on PostgreSQL"""
+    return cast(literal(status, ImportStagingRow.status.type), ImportStagingRow.status.type)
+
 
 class Database:
     def __init__(self):
         db_url = get_database_url()
         self.engine = create_engine(db_url)
         Base.metadata.create_all(self.engine)
+        self._ensure_columns()
+        self._ensure_indexes()
         self.SessionLocal = sessionmaker(bind=self.engine)
+        self._write_listeners = []
+        self.has_pg_trgm = self._ensure_trigram_indexes()
     
     def get_session(self):
         return self.SessionLocal()
     
+    def _ensure_columns(self):
+        """Add nullable columns added to models after their tables already existed"""
+        inspector = inspect(self.engine)
+        for table in (ImportJob.__table__, ImportStagingRow.__table__):
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    with self.engine.begin() as conn:
+                        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                                          f"{column.type.compile(self.engine.dialect)}"))
+    
+    def _ensure_indexes(self):
+        """Create indexes added to models after their tables already existed"""
+        for index in Component.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+        for index in ComponentReference.__table__.indexes:
+            try:
+                index.create(self.engine, checkfirst=True)
+            except IntegrityError:
+                # Duplicates stored by concurrent ingests before the unique index existed
+                self._delete_duplicate_references()
+                index.create(self.engine, checkfirst=True)
+    
+    def _delete_duplicate_references(self):
+        """Keep one row of each (component, key, value, path) reference"""
+        keep = select(func.min(ComponentReference.uid).label('uid')).group_by(
+            ComponentReference.component_uid, ComponentReference.key,
+            ComponentReference.value, ComponentReference.path
+        ).subquery()
+        with self.engine.begin() as conn:
+            conn.execute(delete(ComponentReference).where(ComponentReference.uid.notin_(select(keep.c.uid))))
+    
+    def _ensure_trigram_indexes(self):
+        """Enable pg_trgm and its GIN indexes on PostgreSQL; False elsewhere or without permission"""
+        if self.engine.dialect.name != 'postgresql':
+            return False
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_components_name_trgm "
+                    "ON components USING gin (name gin_trgm_ops)"
+                ))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_components_description_trgm "
+                    "ON components USING gin (description gin_trgm_ops)"
+                ))
+            return True
+        except Exception:
+            return False
+    
+    def add_write_listener(self, listener):
+        """
+        Register an in-process index notified after component writes.
+        
+        Listeners implement component_saved(component), component_deleted(uid)
+        and components_bulk_changed().
+        """
+        self._write_listeners.append(listener)
+    
+    def _notify_saved(self, component):
+        for listener in self._write_listeners:
+            listener.component_saved(component)
+    
+    def _notify_deleted(self, uid):
+        for listener in self._write_listeners:
+            listener.component_deleted(uid)
+    
+    def _notify_bulk_changed(self):
+        """Tell listeners many rows changed at once so they reload rather than patch"""
+        for listener in self._write_listeners:
+            listener.components_bulk_changed()
+    
     def create_component(self, component_data):
         session = self.get_session()
         try:
@@ -23,11 +124,12 @@ class Database:
             session.add(component)
             session.commit()
             session.refresh(component)
+            self._notify_saved(component)
             return component
         finally:
             session.close()
     
-    def get_all_components(self, category=None, type_filter=None, search=None, limit=50, offset=0):
+    def get_all_components(self, category=None, type_filter=None, search=None, limit=50, offset=0, change_type=None):
         session = self.get_session()
         try:
             query = session.query(Component)
@@ -38,6 +140,9 @@ class Database:
             if type_filter:
                 query = query.filter(Component.type == type_filter)
             
+            if change_type:
+                query = query.filter(Component.change_type == change_type)
+            
             if search:
                 query = query.filter(
                     (Component.name.contains(search)) | 
@@ -69,6 +174,7 @@ class Database:
                 component.updated_at = datetime.utcnow()
                 session.commit()
                 session.refresh(component)
+                self._notify_saved(component)
                 return component
             return None
         finally:
@@ -80,12 +186,109 @@ class Database:
             component = session.query(Component).filter(Component.uid == uid).first()
             if component:
                 session.delete(component)
+                session.query(ComponentReference).filter(
+                    ComponentReference.component_uid == uid
+                ).delete(synchronize_session=False)
                 session.commit()
+                self._notify_deleted(uid)
                 return True
             return False
         finally:
             session.close()
     
+    def get_component_stats(self):
+        """Return component counts per category and per change type"""
+        session = self.get_session()
+        try:
+            by_category = dict(session.query(Component.category, func.count()).group_by(Component.category).all())
+            by_change = dict(session.query(Component.change_type, func.count()).group_by(Component.change_type).all())
+            return {
+                'total': sum(by_category.values()),
+                'by_category': by_category,
+                'by_change_type': by_change
+            }
+        finally:
+            session.close()
+    
+    def count_components(self):
+        session = self.get_session()
+        try:
+            return session.query(func.count(Component.uid)).scalar()
+        finally:
+            session.close()
+    
+    def get_component_rows(self, updated_since=None):
+        """Return component column tuples, optionally only rows updated at or after a timestamp"""
+        session = self.get_session()
+        try:
+            query = session.query(*[getattr(Component, column) for column in COMPONENT_COLUMNS])
+            if updated_since is not None:
+                query = query.filter(Component.updated_at >= updated_since)
+            return query.all()
+        finally:
+            session.close()
+    
+    def get_component_fuzzy_rows(self):
+        """Return (uid, name, description, category) for every component"""
+        session = self.get_session()
+        try:
+            return session.query(
+                Component.uid, Component.name, Component.description, Component.category
+            ).all()
+        finally:
+            session.close()
+    
+    def search_components_trigram(self, query, category=None, limit=1000, threshold=0.5):
+        """Return [(uid, score)] ranked by pg_trgm word similarity (PostgreSQL only)"""
+        session = self.get_session()
+        try:
+            session.execute(
+                text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+                {'threshold': str(threshold)}
+            )
+            description = func.coalesce(Component.description, '')
+            score = func.greatest(
+                func.word_similarity(query, Component.name),
+                func.word_similarity(query, description)
+            ).label('score')
+            # `<%` lets the planner use the GIN trigram indexes
+            q = session.query(Component.uid, score).filter(
+                literal(query).op('<%')(Component.name) | literal(query).op('<%')(Component.description)
+            )
+            if category:
+                q = q.filter(Component.category == category)
+            return [(uid, float(s)) for uid, s in q.order_by(score.desc()).limit(limit).all()]
+        finally:
+            session.close()
+    
+    def get_components_by_uids(self, uids, type_filter=None, change_type=None):
+        """Return components for `uids` in the given order, optionally filtered"""
+        if not uids:
+            return []
+        session = self.get_session()
+        try:
+            found = {}
+            for start in range(0, len(uids), 500):
+                query = session.query(Component).filter(Component.uid.in_(uids[start:start + 500]))
+                if type_filter:
+                    query = query.filter(Component.type == type_filter)
+                if change_type:
+                    query = query.filter(Component.change_type == change_type)
+                found.update((c.uid, c) for c in query.all())
+            return [found[uid] for uid in uids if uid in found]
+        finally:
+            session.close()
+    
+    def get_component_search_keys(self):
+        """Return (uid, name, component_id, category) for every component"""
+        session = self.get_session()
+        try:
+            return session.query(
+                Component.uid, Component.name, Component.component_id, Component.category
+            ).all()
+        finally:
+            session.close()
+    
     def get_types_by_category(self, category):
         session = self.get_session()
         try:
@@ -96,6 +299,659 @@ class Database:
         finally:
             session.close()
     
+    # Batch import staging methods
+    def stage_import(self, batch_id, components, chunk_size=1000):
+        """
+        Bulk insert parsed components into the staging table.
+        
+        Args:
+            batch_id: Identifier shared by every row of this import
+            components: Iterable of (row_no, component dict)
+        
+        Returns:
+            Number of staged rows
+        """
+        session = self.get_session()
+        try:
+            # Drop batches abandoned more than a day ago, unless a job still has to resume them
+            session.query(ImportStagingRow).filter(
+                ImportStagingRow.created_at < datetime.utcnow() - timedelta(days=1),
+                ImportStagingRow.batch_id.notin_(
+                    select(ImportJob.batch_id).where(
+                        ImportJob.status.notin_([ImportJobStatus.COMPLETED, ImportJobStatus.CANCELLED])
+                    )
+                )
+            ).delete(synchronize_session=False)
+            
+            staged = 0
+            chunk = []
+            for row_no, component in components:
+                chunk.append({'uid': str(uuid.uuid4()), 'batch_id': batch_id, 'row_no': row_no,
+                              'created_at': datetime.utcnow(), **component})
+                if len(chunk) >= chunk_size:
+                    session.execute(insert(ImportStagingRow), chunk)
+                    staged += len(chunk)
+                    chunk = []
+            if chunk:
+                session.execute(insert(ImportStagingRow), chunk)
+                staged += len(chunk)
+            self._annotate_staged(session, batch_id, prefill_change_type=True)
+            session.commit()
+            return staged
+        finally:
+            session.close()
+    
+    def _annotate_staged(self, session, batch_id, where=None, prefill_change_type=False, find_duplicates=True):
+        """
+        Compare staged rows with existing components in two set-based UPDATEs.
+        
+        Rows are matched on component ID and category and marked new, changed
+        or unchanged; a repeat of an earlier line in the same paste is marked
+        duplicate. With `prefill_change_type`, matched rows become "Updated".
+        A paste only supplies name and URL, so description and type count
+        towards a change only once edited in the preview.
+        
+        Without `find_duplicates`, rows already marked duplicate keep that
+        status; promotion re-checks this way because the earlier lines may
+        have been promoted and dropped from staging already.
+        """
+        staged = ImportStagingRow.batch_id == batch_id
+        if where is not None:
+            staged = and_(staged, where)
+        
+        if find_duplicates:
+            earlier = aliased(ImportStagingRow)
+            first_row_no = select(func.min(earlier.row_no)).where(
+                earlier.batch_id == ImportStagingRow.batch_id,
+                earlier.component_id == ImportStagingRow.component_id,
+                earlier.category == ImportStagingRow.category
+            ).scalar_subquery()
+            session.execute(
+                update(ImportStagingRow).where(staged).values(
+                    status=case((ImportStagingRow.row_no > first_row_no, _import_status(ImportStatus.DUPLICATE)),
+                                else_=_import_status(ImportStatus.NEW)),
+                    existing_uid=None
+                )
+            )
+        else:
+            session.execute(
+                update(ImportStagingRow).where(staged, ImportStagingRow.status != ImportStatus.DUPLICATE).values(
+                    status=ImportStatus.NEW,
+                    existing_uid=None
+                )
+            )
+        
+        unchanged = and_(
+            ImportStagingRow.name == Component.name,
+            ImportStagingRow.url_link == Component.url_link,
+            or_(ImportStagingRow.type_edited.isnot(True), ImportStagingRow.type == Component.type),
+            or_(ImportStagingRow.description_edited.isnot(True),
+                func.coalesce(ImportStagingRow.description, '') == func.coalesce(Component.description, ''))
+        )
+        values = {
+            'existing_uid': Component.uid,
+            'status': case((unchanged, _import_status(ImportStatus.UNCHANGED)), else_=_import_status(ImportStatus.CHANGED))
+        }
+        if prefill_change_type:
+            values['change_type'] = ChangeType.UPDATED
+        session.execute(
+            update(ImportStagingRow).where(
+                staged,
+                ImportStagingRow.status == ImportStatus.NEW,
+                ImportStagingRow.component_id == Component.component_id,
+                ImportStagingRow.category == Component.category
+            ).values(values)
+        )
+    
+    def get_staged_rows(self, batch_id, limit=100, offset=0, status=None):
+        """Return one page of staged rows in paste order and the number of matching rows"""
+        session = self.get_session()
+        try:
+            query = session.query(ImportStagingRow).filter(ImportStagingRow.batch_id == batch_id)
+            if status:
+                query = query.filter(ImportStagingRow.status == status)
+            total = query.count()
+            rows = query.order_by(ImportStagingRow.row_no).limit(limit).offset(offset).all()
+            return rows, total
+        finally:
+            session.close()
+    
+    def count_staged_by_status(self, batch_id):
+        """Return {ImportStatus: row count} for a staged batch"""
+        session = self.get_session()
+        try:
+            return dict(
+                session.query(ImportStagingRow.status, func.count(ImportStagingRow.uid))
+                .filter(ImportStagingRow.batch_id == batch_id)
+                .group_by(ImportStagingRow.status)
+                .all()
+            )
+        finally:
+            session.close()
+    
+    def update_staged_row(self, uid, update_data):
+        session = self.get_session()
+        try:
+            row = session.query(ImportStagingRow).filter(ImportStagingRow.uid == uid).first()
+            if not row:
+                return False
+            batch_id = row.batch_id
+            update_data = dict(update_data)
+            if 'description' in update_data:
+                update_data['description_edited'] = True
+            if 'type' in update_data:
+                update_data['type_edited'] = True
+            component_ids = {row.component_id, update_data.get('component_id', row.component_id)}
+            session.query(ImportStagingRow).filter(ImportStagingRow.uid == uid).update(
+                update_data, synchronize_session=False
+            )
+            # Rows sharing the old or new component ID may stop or start repeating this one
+            self._annotate_staged(session, batch_id, where=ImportStagingRow.component_id.in_(component_ids))
+            session.commit()
+            return True
+        finally:
+            session.close()
+    
+    def _promote_staged(self, session, batch_id, where, now):
+        """
+        Apply staged rows matching `where` to `components`: one INSERT ... SELECT
+        for new rows and one UPDATE ... FROM for changed ones, then drop them
+        from staging. Unchanged and duplicate rows are skipped.
+        
+        Returns:
+            Tuple of (components created, components updated)
+        """
+        # Re-check against components written since the batch was staged
+        self._annotate_staged(session, batch_id, where=where, find_duplicates=False)
+        
+        staged = select(
+            ImportStagingRow.uid, ImportStagingRow.component_id, ImportStagingRow.name,
+            ImportStagingRow.url_link, ImportStagingRow.change_type, ImportStagingRow.description,
+            ImportStagingRow.category, ImportStagingRow.type,
+            literal(now, DateTime), literal(now, DateTime)
+        ).where(ImportStagingRow.batch_id == batch_id, where, ImportStagingRow.status == ImportStatus.NEW)
+        created = session.execute(insert(Component).from_select(COMPONENT_COLUMNS, staged)).rowcount
+        
+        updated = session.execute(
+            update(Component).where(
+                ImportStagingRow.batch_id == batch_id,
+                where,
+                ImportStagingRow.status == ImportStatus.CHANGED,
+                Component.uid == ImportStagingRow.existing_uid
+            ).values(
+                name=ImportStagingRow.name,
+                url_link=ImportStagingRow.url_link,
+                change_type=ImportStagingRow.change_type,
+                description=case((ImportStagingRow.description_edited.is_(True), ImportStagingRow.description),
+                                 else_=Component.description),
+                type=case((ImportStagingRow.type_edited.is_(True), ImportStagingRow.type), else_=Component.type),
+                updated_at=now
+            )
+        ).rowcount
+        
+        session.query(ImportStagingRow).filter(
+            ImportStagingRow.batch_id == batch_id, where
+        ).delete(synchronize_session=False)
+        return created, updated
+    
+    def discard_staged_import(self, batch_id):
+        session = self.get_session()
+        try:
+            session.query(ImportStagingRow).filter(
+                ImportStagingRow.batch_id == batch_id
+            ).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+    
+    def _tracked_component_ids(self, session, component_ids, category):
+        found = set()
+        component_ids = list(component_ids)
+        for i in range(0, len(component_ids), 500):
+            found.update(row[0] for row in session.query(Component.component_id).filter(
+                Component.category == category,
+                Component.component_id.in_(component_ids[i:i + 500])
+            ))
+        return found
+    
+    def get_tracked_component_ids(self, component_ids, category):
+        """Return which of `component_ids` already exist in `category` (one IN query per 500 IDs)"""
+        session = self.get_session()
+        try:
+            return self._tracked_component_ids(session, component_ids, category)
+        finally:
+            session.close()
+    
+    def create_missing_components(self, components):
+        """
+        Bulk insert the components whose component ID is not tracked yet in
+        their category, in a single transaction.
+        
+        Returns:
+            Number of components created
+        """
+        session = self.get_session()
+        try:
+            by_category = {}
+            for component in components:
+                by_category.setdefault(component['category'], {}).setdefault(component['component_id'], component)
+            
+            now = datetime.utcnow()
+            rows = []
+            for category, candidates in by_category.items():
+                tracked = self._tracked_component_ids(session, candidates, category)
+                rows.extend(
+                    {'uid': str(uuid.uuid4()), 'created_at': now, 'updated_at': now, **component}
+                    for component_id, component in candidates.items() if component_id not in tracked
+                )
+            if rows:
+                session.execute(insert(Component), rows)
+            session.commit()
+            if rows:
+                self._notify_bulk_changed()
+            return len(rows)
+        finally:
+            session.close()
+    
+    # Component reference methods
+    def get_component_by_component_id(self, component_id, category=None):
+        session = self.get_session()
+        try:
+            query = session.query(Component).filter(Component.component_id == component_id)
+            if category:
+                query = query.filter(Component.category == category)
+            return query.order_by(Component.updated_at.desc()).first()
+        finally:
+            session.close()
+    
+    def replace_component_references(self, component_uid, references):
+        """
+        Make the stored references of a component match a fresh extraction.
+        Only the difference is written, so re-ingesting an unchanged export is
+        a read.
+        
+        Args:
+            references: Iterable of (key, value, path)
+        
+        Returns:
+            Tuple of (references added, references removed)
+        """
+        wanted = set(references)
+        session = self.get_session()
+        try:
+            # A concurrent ingest of the same export may insert the same rows first; diff again then
+            for attempt in range(2):
+                stored = {
+                    (ref.key, ref.value, ref.path): ref.uid
+                    for ref in session.query(ComponentReference).filter(
+                        ComponentReference.component_uid == component_uid
+                    )
+                }
+                
+                removed = [uid for ref, uid in stored.items() if ref not in wanted]
+                for i in range(0, len(removed), 500):
+                    session.query(ComponentReference).filter(
+                        ComponentReference.uid.in_(removed[i:i + 500])
+                    ).delete(synchronize_session=False)
+                
+                added = [
+                    {'uid': str(uuid.uuid4()), 'component_uid': component_uid, 'key': key, 'value': value,
+                     'path': path, 'created_at': datetime.utcnow()}
+                    for key, value, path in wanted if (key, value, path) not in stored
+                ]
+                try:
+                    if added:
+                        session.execute(insert(ComponentReference), added)
+                    session.commit()
+                    return len(added), len(removed)
+                except IntegrityError:
+                    session.rollback()
+                    if attempt:
+                        raise
+        finally:
+            session.close()
+    
+    def get_component_references(self, component_uid):
+        """Return a component's references ordered by key and value"""
+        session = self.get_session()
+        try:
+            return session.query(ComponentReference).filter(
+                ComponentReference.component_uid == component_uid
+            ).order_by(ComponentReference.key, ComponentReference.value, ComponentReference.path).all()
+        finally:
+            session.close()
+    
+    def get_components_referencing(self, value, key=None):
+        """
+        Return components whose exports reference a form_data_id or tablegroup_id.
+        
+        Returns:
+            List of (component, number of references) ordered by name
+        """
+        session = self.get_session()
+        try:
+            query = session.query(Component, func.count(ComponentReference.uid)).join(
+                ComponentReference, ComponentReference.component_uid == Component.uid
+            ).filter(ComponentReference.value == value)
+            if key:
+                query = query.filter(ComponentReference.key == key)
+            return query.group_by(Component.uid).order_by(Component.name).all()
+        finally:
+            session.close()
+    
+    # Import job methods
+    def create_import_job(self, batch_id):
+        """Record a queued job that will promote every row of a staged batch"""
+        session = self.get_session()
+        try:
+            total = session.query(func.count(ImportStagingRow.uid)).filter(
+                ImportStagingRow.batch_id == batch_id
+            ).scalar()
+            job = ImportJob(batch_id=batch_id, total_rows=total)
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            return job
+        finally:
+            session.close()
+    
+    def get_import_job(self, uid):
+        session = self.get_session()
+        try:
+            return session.query(ImportJob).filter(ImportJob.uid == uid).first()
+        finally:
+            session.close()
+    
+    def get_unfinished_import_jobs(self):
+        """Jobs still queued, running or failed, oldest first"""
+        session = self.get_session()
+        try:
+            return session.query(ImportJob).filter(
+                ImportJob.status.in_([ImportJobStatus.QUEUED, ImportJobStatus.RUNNING, ImportJobStatus.FAILED])
+            ).order_by(ImportJob.created_at).all()
+        finally:
+            session.close()
+    
+    def set_import_job_status(self, uid, status, error="", owner=None):
+        """
+        Set a job's status. With `owner`, only while that worker still runs
+        the job, so a worker that lost it cannot overwrite its new state.
+        
+        Returns:
+            True if the job was updated
+        """
+        session = self.get_session()
+        try:
+            query = session.query(ImportJob).filter(ImportJob.uid == uid)
+            if owner is not None:
+                query = query.filter(ImportJob.owner == owner, ImportJob.status == ImportJobStatus.RUNNING)
+            updated = query.update(
+                {'status': status, 'error': error, 'updated_at': datetime.utcnow()}, synchronize_session=False
+            )
+            session.commit()
+            return updated == 1
+        finally:
+            session.close()
+    
+    def claim_import_job(self, uid, owner, stale_seconds):
+        """
+        Mark a job running for `owner` with one conditional UPDATE.
+        
+        Only a queued or failed job, or a running one with no checkpoint for
+        `stale_seconds`, can be claimed, so of several workers resuming the
+        same job at once exactly one gets it.
+        
+        Returns:
+            True if `owner` now runs the job
+        """
+        now = datetime.utcnow()
+        session = self.get_session()
+        try:
+            claimed = session.query(ImportJob).filter(
+                ImportJob.uid == uid,
+                or_(
+                    ImportJob.status.in_([ImportJobStatus.QUEUED, ImportJobStatus.FAILED]),
+                    and_(ImportJob.status == ImportJobStatus.RUNNING,
+                         ImportJob.updated_at < now - timedelta(seconds=stale_seconds))
+                )
+            ).update(
+                {'status': ImportJobStatus.RUNNING, 'owner': owner, 'error': "", 'updated_at': now},
+                synchronize_session=False
+            )
+            session.commit()
+            return claimed == 1
+        finally:
+            session.close()
+    
+    def promote_import_chunk(self, job_uid, chunk_size=500, owner=None):
+        """
+        Promote the next `chunk_size` staged rows of a job past its checkpoint.
+        
+        The rows are applied, removed from staging and the checkpoint advanced
+        in one transaction, so an interrupted job resumes after its last
+        committed chunk. If the chunk fails as a whole it is retried row by row,
+        each row in a savepoint of the same transaction, and rows that still
+        fail are recorded on the job and skipped.
+        
+        The checkpoint only advances from where this call found it, and with
+        `owner` only while that worker still holds the job; otherwise the
+        chunk is rolled back.
+        
+        Returns:
+            Number of staged rows processed; 0 once the batch is exhausted or the job was lost
+        """
+        session = self.get_session()
+        try:
+            job = session.query(ImportJob).filter(ImportJob.uid == job_uid).first()
+            if owner is not None and (job.owner != owner or job.status != ImportJobStatus.RUNNING):
+                return 0
+            chunk = session.query(
+                ImportStagingRow.uid, ImportStagingRow.row_no, ImportStagingRow.component_id
+            ).filter(
+                ImportStagingRow.batch_id == job.batch_id,
+                ImportStagingRow.row_no > job.checkpoint_row_no
+            ).order_by(ImportStagingRow.row_no).limit(chunk_size).all()
+            if not chunk:
+                return 0
+            
+            batch_id = job.batch_id
+            checkpoint_row_no = job.checkpoint_row_no
+            job_row_errors = job.row_errors
+            last_row_no = chunk[-1].row_no
+            in_chunk = and_(ImportStagingRow.row_no > checkpoint_row_no,
+                            ImportStagingRow.row_no <= last_row_no)
+            now = datetime.utcnow()
+            row_errors = []
+            advanced = update(ImportJob).where(
+                ImportJob.uid == job_uid,
+                ImportJob.checkpoint_row_no == checkpoint_row_no
+            )
+            if owner is not None:
+                advanced = advanced.where(ImportJob.owner == owner, ImportJob.status == ImportJobStatus.RUNNING)
+            try:
+                created, updated = self._promote_staged(session, batch_id, in_chunk, now)
+            except SQLAlchemyError:
+                session.rollback()
+                # Check the job is still ours before the rows; the write also opens the
+                # transaction their savepoints nest in (pysqlite only begins on a write)
+                if session.execute(advanced.values(updated_at=now)).rowcount != 1:
+                    session.rollback()
+                    return 0
+                created = updated = 0
+                for row in chunk:
+                    try:
+                        with session.begin_nested():
+                            row_created, row_updated = self._promote_staged(
+                                session, batch_id, ImportStagingRow.uid == row.uid, now
+                            )
+                        created += row_created
+                        updated += row_updated
+                    except SQLAlchemyError as e:
+                        row_errors.append({
+                            'row_no': row.row_no,
+                            'component_id': row.component_id,
+                            'error': str(getattr(e, 'orig', None) or e)
+                        })
+            
+            values = {
+                'processed_rows': ImportJob.processed_rows + len(chunk),
+                'created_count': ImportJob.created_count + created,
+                'updated_count': ImportJob.updated_count + updated,
+                'skipped_count': ImportJob.skipped_count + len(chunk) - created - updated - len(row_errors),
+                'checkpoint_row_no': last_row_no,
+                'updated_at': now
+            }
+            if row_errors:
+                values['row_errors'] = json.dumps(json.loads(job_row_errors or "[]") + row_errors)
+            if session.execute(advanced.values(values)).rowcount != 1:
+                # Another worker took the job over meanwhile
+                session.rollback()
+                return 0
+            session.commit()
+            self._notify_bulk_changed()
+            return len(chunk)
+        finally:
+            session.close()
+    
+    # Audit trail cache methods
+    @staticmethod
+    def audit_event_id(event):
+        """The event's `id`, or a stable hash of its content for events without one"""
+        event_id = event.get('id')
+        if event_id is not None:
+            return str(event_id)
+        content = json.dumps(event, sort_keys=True, ensure_ascii=False, default=str)
+        return 'sha1:' + hashlib.sha1(content.encode('utf-8')).hexdigest()
+    
+    def save_audit_events(self, form_data_id, record_id, events, chunk_size=500):
+        """
+        Cache audit trail events of a record, skipping events already cached
+        and events without a usable timestamp.
+        
+        Returns:
+            Number of events added
+        """
+        by_id = {}
+        undated = 0
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            if event_timestamp(event, default=None) is None:
+                undated += 1
+                continue
+            by_id.setdefault(self.audit_event_id(event), event)
+        if undated:
+            logger.warning("Not caching %d audit event(s) of record %s without a usable timestamp", undated, record_id)
+        if not by_id:
+            return 0
+        
+        session = self.get_session()
+        try:
+            event_ids = list(by_id)
+            cached = set()
+            for i in range(0, len(event_ids), chunk_size):
+                cached.update(session.scalars(select(AuditEvent.event_id).where(
+                    AuditEvent.form_data_id == form_data_id,
+                    AuditEvent.record_id == record_id,
+                    AuditEvent.event_id.in_(event_ids[i:i + chunk_size])
+                )))
+            
+            now = datetime.utcnow()
+            rows = [
+                {
+                    'uid': str(uuid.uuid4()),
+                    'form_data_id': form_data_id,
+                    'record_id': record_id,
+                    'event_id': event_id,
+                    'timestamp': event_timestamp(event),
+                    'action': str(event.get('action') or ''),
+                    'email': str(event.get('email') or ''),
+                    'payload': json.dumps(event, ensure_ascii=False),
+                    'fetched_at': now
+                }
+                for event_id, event in by_id.items() if event_id not in cached
+            ]
+            for i in range(0, len(rows), chunk_size):
+                session.execute(insert(AuditEvent), rows[i:i + chunk_size])
+            session.commit()
+            return len(rows)
+        finally:
+            session.close()
+    
+    def get_latest_audit_timestamp(self, form_data_id, record_id):
+        """Timestamp (ms) of the newest cached event of a record, or None if nothing is cached"""
+        session = self.get_session()
+        try:
+            return session.query(func.max(AuditEvent.timestamp)).filter(
+                AuditEvent.form_data_id == form_data_id,
+                AuditEvent.record_id == record_id
+            ).scalar()
+        finally:
+            session.close()
+    
+    def get_audit_events(self, form_data_id, record_id, descending=True, since=None):
+        """
+        Return the cached events of a record as the API returned them.
+        
+        Args:
+            since: Only events newer than this timestamp (ms)
+        """
+        session = self.get_session()
+        try:
+            query = select(AuditEvent.payload).where(
+                AuditEvent.form_data_id == form_data_id,
+                AuditEvent.record_id == record_id
+            )
+            if since is not None:
+                query = query.where(AuditEvent.timestamp > since)
+            order = AuditEvent.timestamp.desc() if descending else AuditEvent.timestamp.asc()
+            return [json.loads(payload) for payload in session.scalars(query.order_by(order))]
+        finally:
+            session.close()
+    
+    def get_cached_audit_records(self):
+        """
+        Records with cached audit events, most recently synced first.
+        
+        Returns:
+            List of dicts with form_data_id, record_id, events, latest_timestamp and fetched_at
+        """
+        session = self.get_session()
+        try:
+            rows = session.query(
+                AuditEvent.form_data_id,
+                AuditEvent.record_id,
+                func.count(AuditEvent.uid),
+                func.max(AuditEvent.timestamp),
+                func.max(AuditEvent.fetched_at)
+            ).group_by(AuditEvent.form_data_id, AuditEvent.record_id).order_by(
+                func.max(AuditEvent.fetched_at).desc()
+            ).all()
+            return [
+                {
+                    'form_data_id': form_data_id,
+                    'record_id': record_id,
+                    'events': count,
+                    'latest_timestamp': latest,
+                    'fetched_at': fetched_at
+                }
+                for form_data_id, record_id, count, latest, fetched_at in rows
+            ]
+        finally:
+            session.close()
+    
+    def delete_cached_audit_events(self, form_data_id, record_id):
+        session = self.get_session()
+        try:
+            deleted = session.query(AuditEvent).filter(
+                AuditEvent.form_data_id == form_data_id,
+                AuditEvent.record_id == record_id
+            ).delete(synchronize_session=False)
+            session.commit()
+            return deleted
+        finally:
+            session.close()
+    
     # API Request methods
     def create_api_request(self, request_data):
         """Create a new API request"""
@@ -0,0 +1,305 @@
+"""Process-wide form_data_id -> tablegroup_id index, reloaded when its file changes"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime
+from src.config import DM_INDEX_PATH, DM_INDEX_CHECK_SECONDS
+
+# Binary index layout (all integers little-endian):
+#   header   magic "DMIX", version, entry count
+#   records  entry count x (key offset, value offset) into the pool, sorted by key
+#   pool     length-prefixed UTF-8 strings (1 length byte), values deduplicated
+IDX_SUFFIX = '.idx'
+_MAGIC = b'DMIX'
+_VERSION = 1
+_HEADER = struct.Struct('<4sII')
+_RECORD = struct.Struct('<II')
+
+logger = logging.getLogger(__name__)
+
+
+def build_binary_index(json_path, idx_path=None):
+    """
+    Convert an indexed-data-managers.json mapping to the memory-mapped format.
+
+    The file is written next to the JSON by default and replaced atomically,
+    so running processes pick it up on their next reload check.
+
+    Returns:
+        Path of the written index
+    """
+    idx_path = idx_path or os.path.splitext(json_path)[0] + IDX_SUFFIX
+    with open(json_path, 'r', encoding='utf-8') as f:
+        mapping = json.load(f)
+
+    pool = bytearray()
+    offsets = {}
+
+    def intern(text):
+        offset = offsets.get(text)
+        if offset is None:
+            data = text.encode('utf-8')
+            if len(data) > 255:
+                raise ValueError(f"ID longer than 255 bytes: {text[:40]}...")
+            offset = offsets[text] = len(pool)
+            pool.append(len(data))
+            pool.extend(data)
+        return offset
+
+    records = sorted((key.encode('utf-8'), intern(key), intern(value)) for key, value in mapping.items())
+
+    tmp_path = f"{idx_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(records)))
+        for _, key_offset, value_offset in records:
+            f.write(_RECORD.pack(key_offset, value_offset))
+        f.write(pool)
+    os.replace(tmp_path, idx_path)
+    return idx_path
+
+
+class MappedDmIndex:
+    """
+    Read-only view of a binary index file.
+
+    Opening it only maps the file, so startup cost does not depend on its
+    size, and every process reading the same file shares its pages.
+    Lookups binary-search the sorted records.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} DM index")
+        self._count = count
+        pool_start = _HEADER.size + count * _RECORD.size
+        if len(self._mm) < pool_start:
+            raise ValueError(f"{path} is truncated: {count} records need {pool_start} bytes, file has {len(self._mm)}")
+        # Records as a flat array of (key offset, value offset) pairs, without copying
+        self._records = memoryview(self._mm)[_HEADER.size:pool_start].cast('I')
+        if sys.byteorder != 'little':
+            self._records = array('I', self._records)
+            self._records.byteswap()
+        self._pool = pool_start + 1  # Offsets point at a string's length byte; data follows it
+
+    def get(self, form_data_id, default=None):
+        target = form_data_id.encode('utf-8')
+        mm, records, pool = self._mm, self._records, self._pool
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            start = pool + records[mid << 1]
+            key = mm[start:start + mm[start - 1]]
+            if key < target:
+                lo = mid + 1
+            elif key > target:
+                hi = mid
+            else:
+                start = pool + records[(mid << 1) + 1]
+                return mm[start:start + mm[start - 1]].decode('utf-8')
+        return default
+
+    def __len__(self):
+        return self._count
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DmIndex:
+    """
+    Mapping from indexed-data-managers.json, loaded once and shared by every session.
+
+    If a binary index built from the JSON sits next to it and is at least as
+    new, the binary index is memory-mapped instead of parsing the JSON.
+
+    At most every `check_seconds` a lookup stats the file; only when its mtime
+    or size moved is the content hashed, and only a new hash triggers a
+    reload. Page reruns in between do no file I/O at all.
+
+    A file that fails to load is logged and the last good mapping kept,
+    except when a mapped binary index was rewritten in place rather than
+    replaced: its old pages are gone, so it is dropped.
+    """
+
+    def __init__(self, path, check_seconds=DM_INDEX_CHECK_SECONDS):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._mapping = {}
+        self._signature = None
+        self._sha256 = None
+        self._next_check = 0.0
+        self._mapped_file = None  # (st_dev, st_ino) of the memory-mapped index, if one is loaded
+        self.loaded_path = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.lookups = 0
+        self.hits = 0
+        self.error = None
+
+    def _resolve_path(self):
+        """The binary index beside the JSON if it is up to date, else the configured file"""
+        if self.path.endswith(IDX_SUFFIX):
+            return self.path
+        idx_path = os.path.splitext(self.path)[0] + IDX_SUFFIX
+        try:
+            if os.stat(idx_path).st_mtime_ns >= os.stat(self.path).st_mtime_ns:
+                return idx_path
+        except OSError:
+            pass
+        return self.path
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_seconds
+            path = self._resolve_path()
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self._mapping, self._signature, self._sha256 = {}, None, None
+                self.error = f"{path} not found"
+                return
+            except OSError as e:
+                self._fail(path, e)
+                return
+
+            signature = (path, stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return
+
+            try:
+                sha256 = _file_sha256(path)
+                self._signature = signature
+                if sha256 == self._sha256:
+                    # Touched or rewritten with the same content
+                    self.error = None
+                    return
+
+                if path.endswith(IDX_SUFFIX):
+                    mapping = MappedDmIndex(path)
+                else:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        mapping = json.load(f)
+            except (OSError, struct.error, ValueError) as e:
+                # Truncated, half-written or replaced underneath us: keep serving the last good
+                # mapping, unless that is a map of this very file, whose pages may now be gone
+                if self._mapped_file == (stat.st_dev, stat.st_ino):
+                    self._mapping, self._sha256, self._mapped_file = {}, None, None
+                self._fail(path, e)
+                return
+
+            self._mapping = mapping
+            self._sha256 = sha256
+            self._mapped_file = (stat.st_dev, stat.st_ino) if isinstance(mapping, MappedDmIndex) else None
+            self.loaded_path = path
+            self.loaded_at = datetime.now()
+            self.reloads += 1
+            self.error = None
+
+    def _fail(self, path, error):
+        self.error = f"Could not load {path}: {error}"
+        logger.warning("%s; serving %d previously loaded entries", self.error, len(self._mapping))
+
+    def get(self, form_data_id):
+        """Return the tablegroup_id for a form_data_id, or None"""
+        self._refresh()
+        tablegroup_id = self._mapping.get(form_data_id)
+        self.lookups += 1
+        if tablegroup_id is not None:
+            self.hits += 1
+        return tablegroup_id
+
+    def __contains__(self, form_data_id):
+        return self.get(form_data_id) is not None
+
+    def __len__(self):
+        self._refresh()
+        return len(self._mapping)
+
+    def stats(self):
+        """Size, freshness and hit rate of the index"""
+        self._refresh()
+        return {
+            'entries': len(self._mapping),
+            'path': self.loaded_path,
+            'format': 'binary' if isinstance(self._mapping, MappedDmIndex) else 'json',
+            'sha256': self._sha256[:12] if self._sha256 else None,
+            'loaded_at': self.loaded_at.strftime('%Y-%m-%d %H:%M:%S') if self.loaded_at else None,
+            'reloads': self.reloads,
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'misses': self.lookups - self.hits,
+            'error': self.error
+        }
+
+
+# Process-wide index shared by every session
+dm_index = DmIndex(DM_INDEX_PATH)
+
+
+def benchmark(entries=300_000, lookups=100_000):
+    """Compare loading and querying a JSON mapping of `entries` IDs with its binary index"""
+    import random
+    import string
+    import tempfile
+
+    def random_id():
+        return ''.join(random.choices(string.ascii_letters + string.digits + '_-', k=9))
+
+    groups = [random_id() for _ in range(max(1, entries // 50))]
+    mapping = {random_id(): random.choice(groups) for _ in range(entries)}
+    keys = random.choices(list(mapping), k=lookups)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'indexed-data-managers.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(mapping, f)
+        del mapping
+
+        start = time.perf_counter()
+        idx_path = build_binary_index(json_path)
+        print(f"{entries:,} entries: JSON {os.path.getsize(json_path) / 1024 / 1024:.1f} MB, "
+              f"binary {os.path.getsize(idx_path) / 1024 / 1024:.1f} MB, built in {time.perf_counter() - start:.2f}s")
+
+        for label, load in (('json', lambda: json.load(open(json_path, encoding='utf-8'))),
+                            ('binary', lambda: MappedDmIndex(idx_path))):
+            start = time.perf_counter()
+            index = load()
+            opened = time.perf_counter() - start
+            start = time.perf_counter()
+            assert all(index.get(key) for key in keys)
+            per_lookup = (time.perf_counter() - start) / lookups
+            print(f"  {label:6} open {opened * 1000:8.1f} ms, lookup {per_lookup * 1e6:5.2f} us")
+            del index
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:2] == ['build']:
+        print(build_binary_index(sys.argv[2] if len(sys.argv) > 2 else DM_INDEX_PATH,
+                                 sys.argv[3] if len(sys.argv) > 3 else None))
+    elif sys.argv[1:2] == ['--benchmark']:
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 300_000)
+    else:
+        print("Usage: python -m src.utils.dm_index build [JSON_PATH] [IDX_PATH] | --benchmark [ENTRIES]")
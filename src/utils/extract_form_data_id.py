@@ -1,71 +1,404 @@
+"""Extract form_data_id and other references from Visual Programming JSON"""
+
+import argparse
+import csv
+import glob
+import io
+import itertools
 import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+from src.models.component import Category
+from src.utils.dm_index import dm_index
+
+# Keys collected by default. A dotted key matches a value only under that
+# parent key, e.g. "dedicated_job.name" is the trigger's dedicated job name.
+DEFAULT_REFERENCE_KEYS = (
+    'form_data_id',
+    'tablegroup_id',
+    'container_variable',
+    'dedicated_job.name',
+    'job.name',
+    'function.name',
+    'event.name',
+)
+
+
+class Reference(NamedTuple):
+    """One referenced value and where it was found"""
+    key: str
+    value: str
+    path: str
+
+
+def _compile_keys(keys):
+    """Map each leaf key to the parent keys it must appear under (None = any parent)"""
+    leaves = {}
+    for key in keys:
+        parent, _, leaf = key.rpartition('.')
+        leaves.setdefault(leaf, {})[parent or None] = key
+    return leaves
 
-def extract_form_data_ids(obj, form_data_ids=None):
+
+def _format_path(node):
+    """Turn a (parent, key) chain into a JSON path like $.actions[3].form_data_id"""
+    parts = []
+    while node is not None:
+        node, key = node
+        parts.append(f"[{key}]" if isinstance(key, int) else f".{key}")
+    return "$" + "".join(reversed(parts))
+
+
+def iter_references(obj, keys=DEFAULT_REFERENCE_KEYS):
     """
-    Recursively extract all form_data_id values from a nested JSON structure.
-    
-    Args:
-        obj: The object to search (dict, list, or primitive)
-        form_data_ids: Set to store unique form_data_id values
-    
+    Walk a parsed JSON document with an explicit stack and yield every
+    non-empty string stored under one of `keys`.
+
+    Nesting depth is bounded only by memory, so deeply nested `while` and
+    `conditional` action trees cannot hit the recursion limit.
+
+    Yields:
+        Reference(key, value, path) in document order
+    """
+    leaves = _compile_keys(keys)
+    # Each entry is (value, parent key, path) where path is a (parent path, key) chain
+    stack = [(obj, None, None)]
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        node, parent_key, path = pop()
+
+        if isinstance(node, dict):
+            children = []
+            for key, value in node.items():
+                if isinstance(value, str):
+                    wanted = leaves.get(key)
+                    if wanted and value.strip():
+                        name = wanted.get(parent_key) or wanted.get(None)
+                        if name:
+                            yield Reference(name, value, _format_path((path, key)))
+                elif isinstance(value, (dict, list)):
+                    children.append((value, key, (path, key)))
+            # Reversed so children are visited in document order
+            stack.extend(reversed(children))
+
+        elif isinstance(node, list):
+            # List items keep the key of the list so "actions" items see "actions" as parent
+            for index in range(len(node) - 1, -1, -1):
+                item = node[index]
+                if isinstance(item, (dict, list)):
+                    push((item, parent_key, (path, index)))
+
+
+def extract_references(obj, keys=DEFAULT_REFERENCE_KEYS):
+    """
+    Collect references by key in a single pass.
+
+    Returns:
+        Dict of key -> {value: [JSON paths]} with keys in `keys` order
+    """
+    found = {key: {} for key in keys}
+    for ref in iter_references(obj, keys):
+        found[ref.key].setdefault(ref.value, []).append(ref.path)
+    return found
+
+
+def extract_form_data_ids(obj):
+    """
+    Extract all form_data_id values from a nested JSON structure.
+
     Returns:
         Set of unique form_data_id values
     """
-    if form_data_ids is None:
-        form_data_ids = set()
-    
-    if isinstance(obj, dict):
-        # Check if current dict has form_data_id key
-        if 'form_data_id' in obj:
-            value = obj['form_data_id']
-            # Only add non-empty strings
-            if value and isinstance(value, str) and value.strip():
-                form_data_ids.add(value)
-        
-        # Recursively check all values in the dictionary
-        for value in obj.values():
-            extract_form_data_ids(value, form_data_ids)
-    
-    elif isinstance(obj, list):
-        # Recursively check all items in the list
-        for item in obj:
-            extract_form_data_ids(item, form_data_ids)
-    
-    return form_data_ids
-
-
-def main():
-    # Read the component.json file
-    with open('component.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # Read the indexed-data-managers.json file for id to tablegroup_id mapping
-    with open('indexed-data-managers.json', 'r', encoding='utf-8') as f:
-        id_to_tablegroup = json.load(f)
-    
-    # Extract unique form_data_id values
-    form_data_ids = extract_form_data_ids(data)
-    
-    # Sort for consistent output
-    sorted_ids = sorted(form_data_ids)
-    
-    # Print results with URLs
-    print(f"Found {len(sorted_ids)} unique form_data_id values:\n")
-    
-    not_found = []
-    for form_id in sorted_ids:
-        if form_id in id_to_tablegroup:
-            tablegroup_id = id_to_tablegroup[form_id]
-            url = f"- https://studio-uat2.smart-cimb.com/#/form-data/table/{tablegroup_id}/{form_id} "
-            print(url)
+    return {ref.value for ref in iter_references(obj, ('form_data_id',))}
+
+
+# Streaming scan settings
+STREAM_CHUNK_SIZE = 16 * 1024 * 1024
+_MAX_VALUE_BYTES = 64 * 1024  # Longer values straddling a chunk boundary are missed
+_STRING_VALUE = re.compile(rb'\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def scan_references(stream, keys=('form_data_id',), chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Scan raw JSON for string values of `keys` without parsing the document.
+
+    The input is read `chunk_size` bytes at a time, so memory stays bounded
+    however large the export is. Unlike `iter_references` this only supports
+    plain keys (no dotted parents), reports byte offsets instead of JSON paths
+    and does not validate the JSON.
+
+    Args:
+        stream: JSON text or bytes, or a binary file object
+        keys: Keys whose string values are reported
+
+    Yields:
+        (key, value, byte offset) for every non-empty value, in document order
+    """
+    if isinstance(stream, str):
+        stream = stream.encode('utf-8')
+    if isinstance(stream, bytes):
+        stream = io.BytesIO(stream)
+
+    needles = [(key, f'"{key}"'.encode('utf-8')) for key in keys]
+    match_value = _STRING_VALUE.match
+    buf = b''
+    base = 0
+    eof = False
+
+    while not eof:
+        data = stream.read(chunk_size)
+        eof = not data
+        buf = buf[cut:] + data if buf else data
+        # Keys found past `cut` could be cut off mid-value; they are rescanned with the next chunk
+        cut = len(buf) if eof else max(0, len(buf) - _MAX_VALUE_BYTES)
+
+        found = []
+        for key, needle in needles:
+            size = len(needle)
+            end = cut + size - 1  # Only needles starting before `cut`
+            pos = buf.find(needle, 0, end)
+            while pos != -1:
+                match = match_value(buf, pos + size)
+                if match:
+                    raw = match.group(1)
+                    if raw and not raw.isspace():
+                        value = json.loads(b'"' + raw + b'"') if b'\\' in raw else raw.decode('utf-8', 'replace')
+                        found.append((base + pos, key, value))
+                pos = buf.find(needle, pos + size, end)
+        found.sort()
+        for offset, key, value in found:
+            yield key, value, offset
+
+        base += cut
+
+
+def scan_form_data_ids(stream, chunk_size=STREAM_CHUNK_SIZE):
+    """Return the set of form_data_id values in a JSON stream, in bounded memory"""
+    return {value for _, value, _ in scan_references(stream, ('form_data_id',), chunk_size)}
+
+
+# Keys kept in the component reverse-dependency index
+STORED_REFERENCE_KEYS = ('form_data_id', 'tablegroup_id')
+
+
+def ingest_references(export_id, references):
+    """
+    Store the DM references of a VP export on the tracked component whose
+    component ID is the export's top-level "id".
+
+    Args:
+        references: Iterable of (key, value, path) from the export
+
+    Returns:
+        Tuple of (component or None, (references added, references removed))
+    """
+    from src.utils.database import db
+    component = db.get_component_by_component_id(export_id, Category.VP) if export_id else None
+    if not component:
+        return None, (0, 0)
+    stored = [(key, value, path) for key, value, path in references if key in STORED_REFERENCE_KEYS]
+    return component, db.replace_component_references(component.uid, stored)
+
+
+DM_TABLE_URL = "https://studio-uat2.smart-cimb.com/#/form-data/table/{tablegroup_id}/{form_data_id}"
+# Exports larger than this are scanned as a stream instead of parsed whole
+MAX_PARSED_FILE_BYTES = 256 * 1024 * 1024
+OUTPUT_FIELDS = ['source', 'key', 'value', 'path', 'tablegroup_id', 'url']
+
+
+def expand_inputs(inputs):
+    """Resolve files, directories (searched recursively for *.json) and glob patterns to sorted JSON paths"""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.update(glob.glob(os.path.join(item, '**', '*.json'), recursive=True))
+        elif glob.has_magic(item):
+            paths.update(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+        elif os.path.isfile(item):
+            paths.add(item)
         else:
-            not_found.append(form_id)
-    
-    # Print any IDs not found in the index
-    if not_found:
-        print(f"\n\nWarning: {len(not_found)} form_data_id(s) not found in indexed-data-managers.json:")
-        for form_id in not_found:
-            print(f"  - {form_id}")
+            raise FileNotFoundError(item)
+    return sorted(paths)
+
+
+def extract_file(path, keys=DEFAULT_REFERENCE_KEYS):
+    """
+    Extract references from one export file (runs in a worker process).
+
+    Returns:
+        Tuple of (path, export "id" or None, [(key, value, location)], error message or None)
+    """
+    def scan():
+        plain_keys = [key for key in keys if '.' not in key]
+        with open(path, 'rb') as f:
+            return [(key, value, f"byte {offset}") for key, value, offset in scan_references(f, plain_keys)]
+
+    try:
+        if os.path.getsize(path) > MAX_PARSED_FILE_BYTES:
+            return path, None, scan(), None
+        with open(path, 'r', encoding='utf-8') as f:
+            try:
+                data = json.load(f)
+            except RecursionError:
+                # Nested deeper than json.load can recurse
+                return path, None, scan(), None
+        export_id = data.get('id') if isinstance(data, dict) else None
+        return path, export_id, [tuple(ref) for ref in iter_references(data, keys)], None
+    except (OSError, ValueError) as e:
+        return path, None, [], str(e)
+
+
+def main(argv=None):
+    """Extract DM references from many VP exports in parallel and stream them as JSONL or CSV"""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.utils.extract_form_data_id",
+        description="Extract form_data_id and other references from Visual Programming JSON exports."
+    )
+    parser.add_argument('inputs', nargs='*', help="JSON files, directories or glob patterns")
+    parser.add_argument('-f', '--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    parser.add_argument('-k', '--key', dest='keys', action='append',
+                        help=f"Reference key to collect, repeatable (default: {', '.join(DEFAULT_REFERENCE_KEYS)})")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--all', action='store_true',
+                        help="Emit every hit instead of the first occurrence of each key/value")
+    parser.add_argument('--ingest', action='store_true',
+                        help="Also store each export's DM references on the tracked VP component with the same ID")
+    parser.add_argument('--benchmark', type=float, metavar='MB', help="Benchmark the extractor on a MB-sized export")
+    parser.add_argument('--benchmark-stream', metavar='FILE', help="Benchmark the streaming scan on FILE")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return benchmark(args.benchmark)
+    if args.benchmark_stream:
+        return benchmark_stream(args.benchmark_stream)
+    if not args.inputs:
+        parser.error("at least one input is required")
+
+    keys = tuple(args.keys or DEFAULT_REFERENCE_KEYS)
+    # Ingesting replaces a component's stored references, so always extract all of them
+    extract_keys = keys + tuple(key for key in STORED_REFERENCE_KEYS if key not in keys) if args.ingest else keys
+    paths = expand_inputs(args.inputs)
+    out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    if args.format == 'csv':
+        writer = csv.DictWriter(out, fieldnames=OUTPUT_FIELDS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(record):
+            out.write(json.dumps(record) + "\n")
+
+    seen = set()
+    hits = emitted = failed = ingested = 0
+    not_found = set()
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            # Results come back in path order, so the first occurrence kept is the same every run
+            results = executor.map(extract_file, paths, itertools.repeat(extract_keys),
+                                   chunksize=max(1, len(paths) // (4 * (args.workers or 1))))
+            for source, export_id, file_hits, error in results:
+                if error:
+                    failed += 1
+                    print(f"Skipped {source}: {error}", file=sys.stderr)
+                    continue
+                if args.ingest:
+                    component, _ = ingest_references(export_id, file_hits)
+                    ingested += component is not None
+
+                for key, value, location in file_hits:
+                    if key not in keys:
+                        continue
+                    hits += 1
+                    if not args.all:
+                        if (key, value) in seen:
+                            continue
+                        seen.add((key, value))
+
+                    tablegroup_id = dm_index.get(value) if key == 'form_data_id' else None
+                    if key == 'form_data_id' and not tablegroup_id:
+                        not_found.add(value)
+                    write({
+                        'source': source,
+                        'key': key,
+                        'value': value,
+                        'path': location,
+                        'tablegroup_id': tablegroup_id,
+                        'url': DM_TABLE_URL.format(tablegroup_id=tablegroup_id, form_data_id=value)
+                        if tablegroup_id else None
+                    })
+                    emitted += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.ingest:
+        print(f"Stored references for {ingested:,} tracked component(s)", file=sys.stderr)
+    print(f"{len(paths):,} files ({failed:,} skipped), {hits:,} hits, {emitted:,} written, "
+          f"{len(not_found):,} form_data_id(s) not in the DM index "
+          f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+def benchmark_stream(path):
+    """Time the streaming scan of a JSON export on disk against a plain read of it"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        start = time.perf_counter()
+        while f.read(STREAM_CHUNK_SIZE):
+            pass
+        read = time.perf_counter() - start
+
+    with open(path, 'rb') as f:
+        start = time.perf_counter()
+        ids = scan_form_data_ids(f)
+        scan = time.perf_counter() - start
+
+    mb = size / 1024 / 1024
+    print(f"{mb:,.0f} MB: read {read:.2f}s ({mb / read:,.0f} MB/s), "
+          f"scan {scan:.2f}s ({mb / scan:,.0f} MB/s) - {len(ids):,} unique form_data_ids")
+
+
+def benchmark(target_mb=200, depth=100_000):
+    """
+    Time the extractor on component.json repeated until the export is about
+    `target_mb` MB, then on a `depth`-level nested action tree.
+    """
+    sample_path = os.path.join(os.path.dirname(__file__), 'component.json')
+    with open(sample_path, 'r', encoding='utf-8') as f:
+        sample = f.read()
+
+    copies = max(1, int(target_mb * 1024 * 1024 / len(sample)))
+    text = "[" + ",".join([sample] * copies) + "]"
+    print(f"Export: {copies:,} components, {len(text) / 1024 / 1024:,.0f} MB")
+
+    start = time.perf_counter()
+    data = json.loads(text)
+    parsed = time.perf_counter()
+    del text
+    refs = sum(1 for _ in iter_references(data))
+    done = time.perf_counter()
+    print(f"  json.loads {parsed - start:.2f}s, extraction {done - parsed:.2f}s - {refs:,} references")
+    del data
+
+    # Nested while/conditional actions far past the recursion limit, as pasted text
+    leaf = '{"type": "while", "form_data_id": "leaf", "action_while": []}'
+    text = '{"type": "conditional", "action_true": [' * depth + leaf + ']}' * depth
+    start = time.perf_counter()
+    try:
+        tree = json.loads(text)
+    except RecursionError:
+        refs = [value for _, value, _ in scan_references(text)]
+        print(f"Nested {depth:,} levels: json.loads hit the recursion limit, "
+              f"streaming scan found {refs[0]!r} in {time.perf_counter() - start:.2f}s")
+    else:
+        refs = list(iter_references(tree, ('form_data_id',)))
+        print(f"Nested {depth:,} levels: parsed and found {refs[0].value!r} in {time.perf_counter() - start:.2f}s")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+"""Background import jobs that promote staged batches on a worker pool"""
+
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from src.config import IMPORT_JOB_WORKERS, IMPORT_CHUNK_SIZE, IMPORT_JOB_STALE_SECONDS
+from src.models.component import ImportJobStatus
+from src.utils.database import db
+
+# Process-wide pool shared by every session
+_executor = ThreadPoolExecutor(max_workers=IMPORT_JOB_WORKERS, thread_name_prefix="import-job")
+_active = set()
+_active_lock = threading.Lock()
+# Identifies this process as the owner of the jobs it claims
+_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _run(job_uid):
+    try:
+        # Another process may have claimed the job first
+        if not db.claim_import_job(job_uid, _OWNER, IMPORT_JOB_STALE_SECONDS):
+            return
+        while db.promote_import_chunk(job_uid, IMPORT_CHUNK_SIZE, owner=_OWNER):
+            pass
+        db.set_import_job_status(job_uid, ImportJobStatus.COMPLETED, owner=_OWNER)
+    except Exception as e:
+        db.set_import_job_status(job_uid, ImportJobStatus.FAILED, error=str(e), owner=_OWNER)
+    finally:
+        with _active_lock:
+            _active.discard(job_uid)
+
+
+def _start(job_uid):
+    with _active_lock:
+        if job_uid in _active:
+            return False
+        _active.add(job_uid)
+    _executor.submit(_run, job_uid)
+    return True
+
+
+def submit_import_job(batch_id):
+    """Queue promotion of a staged batch and return the job uid"""
+    job = db.create_import_job(batch_id)
+    _start(job.uid)
+    return job.uid
+
+
+def resume_import_job(job_uid):
+    """Restart a failed or interrupted job from its last committed chunk"""
+    return _start(job_uid)
+
+
+def is_job_interrupted(job):
+    """
+    True if a job can be resumed: it failed, or it is marked running but no
+    worker in this process owns it and it has not checkpointed recently
+    (e.g. the server restarted mid-import).
+    """
+    if job.status == ImportJobStatus.FAILED:
+        return True
+    if job.status in (ImportJobStatus.QUEUED, ImportJobStatus.RUNNING):
+        with _active_lock:
+            if job.uid in _active:
+                return False
+        return job.updated_at < datetime.utcnow() - timedelta(seconds=IMPORT_JOB_STALE_SECONDS)
+    return False
@@ -0,0 +1,347 @@
+"""In-process columnar read model of the components table for list pages"""
+
+import sys
+import threading
+import time
+import numpy as np
+from src.config import READ_MODEL_ENABLED, READ_MODEL_MAX_MB, READ_MODEL_REFRESH_SECONDS
+from src.models.component import Category, ChangeType
+from src.utils.database import db, COMPONENT_COLUMNS
+
+CATEGORIES = list(Category)
+CHANGE_TYPES = list(ChangeType)
+_CATEGORY_CODES = {c: i for i, c in enumerate(CATEGORIES)}
+_CHANGE_CODES = {c: i for i, c in enumerate(CHANGE_TYPES)}
+
+# Separates rows inside the search corpus; never typed into the search box
+_ROW_SEP = '\x00'
+_SEARCH_CACHE_SIZE = 64
+_MEMORY_SAMPLE = 1000
+
+
+class ComponentRow:
+    """Read-only stand-in for a `Component` served from the read model"""
+
+    __slots__ = COMPONENT_COLUMNS
+
+    def __init__(self, *values):
+        for column, value in zip(COMPONENT_COLUMNS, values):
+            setattr(self, column, value)
+
+    def to_dict(self):
+        return {
+            'uid': self.uid,
+            'component_id': self.component_id,
+            'name': self.name,
+            'url_link': self.url_link,
+            'change_type': self.change_type.value,
+            'description': self.description,
+            'category': self.category.value,
+            'type': self.type,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
+        }
+
+
+def _object_array(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _to_ns(values):
+    """Datetimes to int64 nanoseconds; missing values sort as the oldest"""
+    return np.array(values, dtype='datetime64[ns]').astype(np.int64)
+
+
+class ComponentReadModel:
+    """
+    Column arrays of every component, filtered and paged in memory.
+
+    Loaded once per process and shared by all Streamlit sessions. Local writes
+    arrive through database write notifications; writes from other processes
+    are picked up by polling `updated_at` every few seconds. Arrays are kept
+    sorted newest first, matching `Database.get_all_components`.
+    """
+
+    def __init__(self, max_bytes, refresh_seconds):
+        self.max_bytes = max_bytes
+        self.refresh_seconds = refresh_seconds
+        self.disabled_reason = None
+        self._lock = threading.RLock()
+        self._arrays = None
+        self._index = {}
+        self._type_codes = {}
+        self._corpus = None
+        self._starts = None
+        self._watermark = None
+        self._watermark_uids = set()
+        self._last_refresh = 0.0
+        self._pending_saved = {}
+        self._pending_deleted = set()
+        self._search_cache = {}
+
+    @property
+    def is_loaded(self):
+        return self._arrays is not None
+
+    def __len__(self):
+        return len(self._index)
+
+    def memory_usage(self):
+        """Approximate bytes held by the column arrays and the objects they point to"""
+        if self._arrays is None:
+            return 0
+        size = len(self._index)
+        total = sum(array.nbytes for array in self._arrays.values())
+        if size:
+            sample = slice(0, min(size, _MEMORY_SAMPLE))
+            per_row = sum(
+                sys.getsizeof(value)
+                for column in ('uid', 'component_id', 'name', 'url_link', 'description', 'type',
+                               'created_at', 'updated_at', 'haystack')
+                for value in self._arrays[column][sample]
+            )
+            total += per_row * size // min(size, _MEMORY_SAMPLE)
+        if self._corpus is not None:
+            total += sys.getsizeof(self._corpus) + self._starts.nbytes
+        return total
+
+    def ensure_loaded(self):
+        """Load on first use; returns False when the model is over budget"""
+        with self._lock:
+            if self.disabled_reason:
+                return False
+            if self._arrays is None:
+                self._reload()
+            return self._arrays is not None
+
+    def _reload(self):
+        self._arrays = None
+        self._index = {}
+        self._type_codes = {}
+        self._apply(db.get_component_rows(), ())
+        self._last_refresh = time.monotonic()
+
+    def _columns_for(self, rows):
+        """Build column arrays (raw and derived) for a batch of component tuples"""
+        raw = {column: _object_array([row[i] for row in rows]) for i, column in enumerate(COMPONENT_COLUMNS)}
+        raw['description'] = _object_array([d or "" for d in raw['description']])
+        raw['category_code'] = np.fromiter((_CATEGORY_CODES[c] for c in raw['category']), dtype=np.int8, count=len(rows))
+        raw['change_code'] = np.fromiter((_CHANGE_CODES[c] for c in raw['change_type']), dtype=np.int8, count=len(rows))
+        raw['type_code'] = np.fromiter(
+            (self._type_codes.setdefault(t, len(self._type_codes)) for t in raw['type']),
+            dtype=np.int32, count=len(rows)
+        )
+        raw['created_ns'] = _to_ns(list(raw['created_at']))
+        raw['updated_ns'] = _to_ns(list(raw['updated_at']))
+        raw['haystack'] = _object_array([
+            f"{name}\x1f{description}\x1f{component_id}".lower()
+            for name, description, component_id in zip(raw['name'], raw['description'], raw['component_id'])
+        ])
+        return raw
+
+    def _apply(self, saved_rows, deleted_uids):
+        """Merge saved rows and drop deleted ones with vectorized array operations"""
+        saved_rows = list(saved_rows)
+        added = self._columns_for(saved_rows)
+
+        if self._arrays is None:
+            merged = added
+            ordered = False
+        else:
+            # Updates keep created_at, and so their position: overwrite in place
+            positions = np.array([self._index.get(uid, -1) for uid in added['uid']], dtype=np.int64)
+            known = positions >= 0
+            in_place = known.copy()
+            in_place[known] = self._arrays['created_ns'][positions[known]] == added['created_ns'][known]
+            for key, array in self._arrays.items():
+                array[positions[in_place]] = added[key][in_place]
+
+            drop = [self._index[uid] for uid in deleted_uids if uid in self._index]
+            drop.extend(positions[known & ~in_place])
+            fresh = ~known | (known & ~in_place)
+            if not drop and not fresh.any():
+                merged = None
+            else:
+                keep = np.ones(len(self._index), dtype=bool)
+                keep[drop] = False
+                added = {key: array[fresh] for key, array in added.items()}
+                # New components are usually the newest, so prepending keeps the order
+                ordered = not len(added['uid']) or not keep.any() or (
+                    added['created_ns'].min() >= self._arrays['created_ns'][keep].max()
+                )
+                if ordered:
+                    added = {key: array[np.argsort(added['created_ns'], kind='stable')[::-1]] for key, array in added.items()}
+                merged = {key: np.concatenate([added[key], self._arrays[key][keep]]) for key in added}
+
+        if merged is not None:
+            if not ordered:
+                # Descending by created_at; missing timestamps (int64 min) end up last
+                order = np.argsort(merged['created_ns'], kind='stable')[::-1]
+                merged = {key: array[order] for key, array in merged.items()}
+            self._arrays = merged
+            self._index = dict(zip(self._arrays['uid'], range(len(self._arrays['uid']))))
+        self._corpus = None
+        self._starts = None
+        self._search_cache = {}
+
+        if len(self._index):
+            latest = self._arrays['updated_ns'].max()
+            self._watermark = np.datetime64(int(latest), 'ns').astype('datetime64[us]').item() if latest != np.iinfo(np.int64).min else None
+            self._watermark_uids = set(self._arrays['uid'][self._arrays['updated_ns'] == latest])
+        else:
+            self._watermark = None
+            self._watermark_uids = set()
+
+        used = self.memory_usage()
+        if used > self.max_bytes:
+            self.disabled_reason = (
+                f"Read model needs {used / 2**20:.0f} MB, over the {self.max_bytes / 2**20:.0f} MB budget"
+            )
+            self._arrays = None
+            self._index = {}
+
+    # Database write notifications
+    def component_saved(self, component):
+        with self._lock:
+            if self._arrays is not None:
+                self._pending_deleted.discard(component.uid)
+                self._pending_saved[component.uid] = tuple(getattr(component, c) for c in COMPONENT_COLUMNS)
+
+    def component_deleted(self, uid):
+        with self._lock:
+            if self._arrays is not None:
+                self._pending_saved.pop(uid, None)
+                self._pending_deleted.add(uid)
+
+    def components_bulk_changed(self):
+        """Poll the database on the next query after a bulk write"""
+        with self._lock:
+            self._last_refresh = 0.0
+
+    def _refresh(self):
+        """Apply queued writes and, every few seconds, rows changed by other processes"""
+        now = time.monotonic()
+        poll = now - self._last_refresh >= self.refresh_seconds
+        if poll:
+            self._last_refresh = now
+            for row in db.get_component_rows(updated_since=self._watermark):
+                # Rows stamped exactly at the watermark were already loaded
+                if row[0] in self._watermark_uids and row[-1] == self._watermark:
+                    continue
+                self._pending_saved[row[0]] = tuple(row)
+
+        if self._pending_saved or self._pending_deleted:
+            saved, deleted = self._pending_saved, self._pending_deleted
+            self._pending_saved = {}
+            self._pending_deleted = set()
+            self._apply(saved.values(), deleted)
+
+        # Deletes made by other processes do not touch updated_at
+        if poll and self._arrays is not None and db.count_components() != len(self._index):
+            self._reload()
+
+    def _scan(self, term):
+        """Row positions whose haystack contains `term`, scanning the whole table"""
+        haystack = self._arrays['haystack']
+        if self._corpus is None:
+            self._corpus = _ROW_SEP.join(haystack)
+            lengths = np.fromiter((len(h) + 1 for h in haystack), dtype=np.int64, count=len(haystack))
+            self._starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+
+        # Rare terms: jump from hit to hit with str.find; common terms: test every row
+        if self._corpus.count(term) > len(haystack) // 16:
+            return np.flatnonzero(np.fromiter((term in h for h in haystack), dtype=bool, count=len(haystack)))
+
+        rows = []
+        pos = self._corpus.find(term)
+        while pos != -1:
+            row = int(np.searchsorted(self._starts, pos, side='right')) - 1
+            rows.append(row)
+            if row + 1 >= len(self._starts):
+                break
+            pos = self._corpus.find(term, int(self._starts[row + 1]))
+        return np.array(rows, dtype=np.int64)
+
+    def _search_rows(self, term):
+        """Row positions whose name, description or component ID contain `term`"""
+        term = term.lower()
+        if term in self._search_cache:
+            return self._search_cache[term]
+
+        # As-you-type queries refine an earlier term, so only its hits can match
+        base = max((cached for cached in self._search_cache if cached in term), key=len, default=None)
+        if base is not None:
+            candidates = self._search_cache[base]
+            haystack = self._arrays['haystack'][candidates]
+            hits = np.fromiter((term in h for h in haystack), dtype=bool, count=len(candidates))
+            result = candidates[hits]
+        else:
+            result = self._scan(term)
+
+        if len(self._search_cache) >= _SEARCH_CACHE_SIZE:
+            self._search_cache.pop(next(iter(self._search_cache)))
+        self._search_cache[term] = result
+        return result
+
+    def query(self, category=None, type_filter=None, change_type=None, search=None, limit=50, offset=0):
+        """Same contract as `Database.get_all_components`, answered from memory"""
+        with self._lock:
+            self._refresh()
+            if self._arrays is None:
+                return db.get_all_components(category=category, type_filter=type_filter, search=search,
+                                             limit=limit, offset=offset, change_type=change_type)
+
+            arrays = self._arrays
+            mask = np.ones(len(self._index), dtype=bool)
+            if category:
+                mask &= arrays['category_code'] == _CATEGORY_CODES[category]
+            if type_filter:
+                mask &= arrays['type_code'] == self._type_codes.get(type_filter, -1)
+            if change_type:
+                mask &= arrays['change_code'] == _CHANGE_CODES[change_type]
+            if search:
+                matched = np.zeros(len(mask), dtype=bool)
+                matched[self._search_rows(search)] = True
+                mask &= matched
+
+            positions = np.flatnonzero(mask)
+            page = positions[offset:offset + limit]
+            columns = [arrays[column][page] for column in COMPONENT_COLUMNS]
+            return [ComponentRow(*values) for values in zip(*columns)], len(positions)
+
+    def stats(self):
+        """Same contract as `Database.get_component_stats`"""
+        with self._lock:
+            self._refresh()
+            if self._arrays is None:
+                return db.get_component_stats()
+            by_category = np.bincount(self._arrays['category_code'], minlength=len(CATEGORIES))
+            by_change = np.bincount(self._arrays['change_code'], minlength=len(CHANGE_TYPES))
+            return {
+                'total': len(self._index),
+                'by_category': {c: int(n) for c, n in zip(CATEGORIES, by_category) if n},
+                'by_change_type': {c: int(n) for c, n in zip(CHANGE_TYPES, by_change) if n}
+            }
+
+
+# Process-wide model shared by every session
+component_read_model = ComponentReadModel(READ_MODEL_MAX_MB * 2**20, READ_MODEL_REFRESH_SECONDS)
+db.add_write_listener(component_read_model)
+
+
+def list_components(category=None, type_filter=None, change_type=None, search=None, limit=50, offset=0):
+    """List components from the read model when enabled, else from the database"""
+    if READ_MODEL_ENABLED and component_read_model.ensure_loaded():
+        return component_read_model.query(category=category, type_filter=type_filter, change_type=change_type,
+                                          search=search, limit=limit, offset=offset)
+    return db.get_all_components(category=category, type_filter=type_filter, search=search,
+                                 limit=limit, offset=offset, change_type=change_type)
+
+
+def get_component_stats():
+    """Component counts from the read model when enabled, else from the database"""
+    if READ_MODEL_ENABLED and component_read_model.ensure_loaded():
+        return component_read_model.stats()
+    return db.get_component_stats()
@@ -0,0 +1,170 @@
+"""In-memory prefix index over component names and IDs for as-you-type search"""
+
+import bisect
+import re
+import threading
+from src.utils.database import db
+
+_WORD_SPLIT = re.compile(r'[\s\[\]()_\-/.,:]+')
+
+
+def _index_keys(name, component_id):
+    """Return the lowercased keys a component should be reachable by"""
+    keys = set()
+    name = (name or "").strip().lower()
+    component_id = (component_id or "").strip().lower()
+
+    if name:
+        keys.add(name)
+        # Also index each word so "valid" finds "[IMPORT] ACCRUE VALIDATION"
+        for word in _WORD_SPLIT.split(name):
+            if word:
+                keys.add(word)
+    if component_id:
+        keys.add(component_id)
+
+    return keys
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, uid) pairs searched with bisect.
+
+    Built once per process from the components table and kept current by
+    database write notifications, so suggestions never touch the database.
+    Every notification bumps `generation`, so a build whose rows were read
+    while a write landed can tell it is already stale.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = []
+        self._keys_by_uid = {}
+        self._docs = {}
+        self.is_built = False
+        self.generation = 0
+
+    def build(self, rows, generation=None):
+        """
+        Build the index from (uid, name, component_id, category) rows.
+
+        Args:
+            generation: `generation` read before the rows were; if a write
+                was notified since, the index is still replaced but stays
+                unbuilt so the next use rebuilds it
+
+        Returns:
+            True if the index is current
+        """
+        entries = []
+        keys_by_uid = {}
+        docs = {}
+
+        for uid, name, component_id, category in rows:
+            keys = _index_keys(name, component_id)
+            keys_by_uid[uid] = keys
+            docs[uid] = (name, component_id, category)
+            entries.extend((key, uid) for key in keys)
+
+        entries.sort()
+
+        with self._lock:
+            self._entries = entries
+            self._keys_by_uid = keys_by_uid
+            self._docs = docs
+            self.is_built = generation is None or generation == self.generation
+            return self.is_built
+
+    def _remove(self, uid):
+        for key in self._keys_by_uid.pop(uid, ()):
+            pos = bisect.bisect_left(self._entries, (key, uid))
+            if pos < len(self._entries) and self._entries[pos] == (key, uid):
+                del self._entries[pos]
+        self._docs.pop(uid, None)
+
+    def component_saved(self, component):
+        """Insert or refresh a component after it was created or updated"""
+        with self._lock:
+            self.generation += 1
+            if not self.is_built:
+                return
+            self._remove(component.uid)
+            keys = _index_keys(component.name, component.component_id)
+            self._keys_by_uid[component.uid] = keys
+            self._docs[component.uid] = (component.name, component.component_id, component.category)
+            for key in keys:
+                bisect.insort(self._entries, (key, component.uid))
+
+    def component_deleted(self, uid):
+        """Drop a component after it was deleted"""
+        with self._lock:
+            self.generation += 1
+            if self.is_built:
+                self._remove(uid)
+
+    def components_bulk_changed(self):
+        """Rebuild on next use after a bulk write"""
+        with self._lock:
+            self.generation += 1
+            self.is_built = False
+
+    def suggest(self, prefix, limit=10, category=None):
+        """
+        Return up to `limit` suggestions whose name, name word or component ID
+        starts with `prefix`.
+
+        Returns:
+            List of dicts with uid, name, component_id and category
+        """
+        prefix = (prefix or "").strip().lower()
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+
+        with self._lock:
+            pos = bisect.bisect_left(self._entries, (prefix,))
+            while pos < len(self._entries) and len(results) < limit:
+                key, uid = self._entries[pos]
+                if not key.startswith(prefix):
+                    break
+                pos += 1
+
+                if uid in seen:
+                    continue
+                seen.add(uid)
+
+                name, component_id, comp_category = self._docs[uid]
+                if category and comp_category != category:
+                    continue
+                results.append({
+                    'uid': uid,
+                    'name': name,
+                    'component_id': component_id,
+                    'category': comp_category
+                })
+
+        return results
+
+    def __len__(self):
+        return len(self._docs)
+
+
+# Process-wide index shared by every session
+name_index = PrefixIndex()
+db.add_write_listener(name_index)
+_build_lock = threading.Lock()
+_BUILD_ATTEMPTS = 3  # Builds raced by writes before serving the last one and rebuilding on next use
+
+
+def suggest_components(prefix, limit=10, category=None):
+    """Return prefix suggestions, building the index on first use"""
+    if not name_index.is_built:
+        with _build_lock:
+            for _ in range(_BUILD_ATTEMPTS):
+                if name_index.is_built:
+                    break
+                generation = name_index.generation
+                name_index.build(db.get_component_search_keys(), generation)
+    return name_index.suggest(prefix, limit=limit, category=category)
@@ -0,0 +1,129 @@
+"""Process-wide de-duplication of identical concurrent calls"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# How a SingleFlight.do call was served
+LEADER = 'network'  # This caller ran the call
+SHARED = 'shared'  # Waited for an identical call already in flight
+CACHED = 'cache'  # A recent result of an identical call
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time and hands its result to every caller
+    that asked for the same key meanwhile; results are then kept for `ttl`
+    seconds so immediate repeats are not sent at all.
+
+    Results may hold resources each consumer releases on its own (a spilled
+    response file): `share(result)` is called once per extra consumer,
+    including the cache while it holds the result, and `release(result)`
+    when the cache lets go of it.
+    """
+
+    def __init__(self, ttl, max_entries=64, share=None, release=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._share = share or (lambda result: None)
+        self._release = release or (lambda result: None)
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._cache = OrderedDict()  # key -> (expires at, result)
+        self.leaders = 0
+        self.shared = 0
+        self.cached = 0
+
+    def _expire(self, now):
+        for key in [key for key, (expires, _) in self._cache.items() if expires <= now]:
+            self._release(self._cache.pop(key)[1])
+
+    def do(self, key, fn, cacheable=None, use_cache=True):
+        """
+        Return fn()'s result for `key`, running fn only if no identical call
+        is in flight or cached. An exception raised by fn is raised to every
+        caller waiting on it and is not cached.
+
+        Args:
+            cacheable: Optional predicate; results failing it are shared with
+                waiting callers but not kept
+            use_cache: False to skip cached results (an identical call in
+                flight is still joined, and the new result is still cached)
+
+        Returns:
+            Tuple of (result, how it was served: LEADER, SHARED or CACHED)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._cache.get(key) if use_cache else None
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self._share(entry[1])
+                self.cached += 1
+                return entry[1], CACHED
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, SHARED
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            call.error = e
+            call.done.set()
+            raise
+
+        with self._lock:
+            # No caller can join once the call is removed, so the count is final
+            del self._calls[key]
+            for _ in range(call.waiters):
+                self._share(result)
+            if self.ttl > 0 and (cacheable is None or cacheable(result)):
+                self._share(result)
+                old = self._cache.pop(key, None)
+                if old is not None:
+                    self._release(old[1])
+                self._cache[key] = (time.monotonic() + self.ttl, result)
+                while len(self._cache) > self.max_entries:
+                    self._release(self._cache.popitem(last=False)[1][1])
+        call.result = result
+        call.done.set()
+        return result, LEADER
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            while self._cache:
+                self._release(self._cache.popitem()[1][1])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'cached_results': len(self._cache),
+                'sent': self.leaders,
+                'shared': self.shared,
+                'cache_hits': self.cached
+            }
@@ -0,0 +1,200 @@
+"""Trigram fuzzy search over component names and descriptions"""
+
+import re
+import threading
+from array import array
+import numpy as np
+from src.config import FUZZY_SEARCH_THRESHOLD, FUZZY_SEARCH_MAX_RESULTS
+from src.models.component import Category
+from src.utils.database import db
+
+_WORD = re.compile(r'[^\W_]+')
+# Rebuild once this share of documents are stale or waiting in pending postings
+_COMPACT_RATIO = 0.2
+_CATEGORY_CODES = {c: i for i, c in enumerate(Category)}
+
+
+def trigrams(text):
+    """
+    Return the trigram set of `text` the way pg_trgm computes it:
+    lowercased alphanumeric words, padded with two leading and one trailing space.
+    """
+    grams = set()
+    for word in _WORD.findall((text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    In-process inverted index from trigram to document numbers.
+
+    Postings are frozen into NumPy arrays so a query is one `bincount` over
+    the postings of its trigrams. Writes tombstone the old document and add
+    the new one to small pending postings; both are folded back in by an
+    occasional compaction. Every notification bumps `generation`, so a build
+    whose rows were read while a write landed can tell it is already stale.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.is_built = False
+        self.generation = 0
+        self._reset()
+
+    def _reset(self):
+        self._postings = {}
+        self._pending = {}
+        self._pending_count = 0
+        self._uids = []
+        self._doc_by_uid = {}
+        self._sizes = array('I')
+        self._alive = array('b')
+        self._categories = array('b')
+        self._dead = 0
+
+    def _add(self, uid, name, description, category, pending):
+        grams = trigrams(name) | trigrams(description)
+        doc = len(self._uids)
+        self._uids.append(uid)
+        self._doc_by_uid[uid] = doc
+        self._sizes.append(len(grams))
+        self._alive.append(1)
+        self._categories.append(_CATEGORY_CODES.get(category, -1))
+
+        target = self._pending if pending else self._postings
+        for gram in grams:
+            postings = target.get(gram)
+            if postings is None:
+                postings = target[gram] = array('I')
+            postings.append(doc)
+        if pending:
+            self._pending_count += 1
+
+    def build(self, rows, generation=None):
+        """
+        Build the index from (uid, name, description, category) rows.
+
+        Args:
+            generation: `generation` read before the rows were; if a write
+                was notified since, the index is still replaced but stays
+                unbuilt so the next use rebuilds it
+
+        Returns:
+            True if the index is current
+        """
+        with self._lock:
+            self._reset()
+            for uid, name, description, category in rows:
+                self._add(uid, name, description, category, pending=False)
+            self._postings = {gram: np.frombuffer(docs, dtype=np.uint32) for gram, docs in self._postings.items()}
+            self.is_built = generation is None or generation == self.generation
+            return self.is_built
+
+    def _compact_if_needed(self):
+        docs = len(self._uids)
+        if docs and (self._dead + self._pending_count) / docs > _COMPACT_RATIO:
+            # Text is not kept in memory, so compaction reloads it
+            self.build(db.get_component_fuzzy_rows())
+
+    # Database write notifications
+    def component_saved(self, component):
+        with self._lock:
+            self.generation += 1
+            if not self.is_built:
+                return
+            self._tombstone(component.uid)
+            self._add(component.uid, component.name, component.description, component.category, pending=True)
+            self._compact_if_needed()
+
+    def component_deleted(self, uid):
+        with self._lock:
+            self.generation += 1
+            if self.is_built:
+                self._tombstone(uid)
+                self._compact_if_needed()
+
+    def components_bulk_changed(self):
+        """Rebuild on next use after a bulk write"""
+        with self._lock:
+            self.generation += 1
+            self.is_built = False
+
+    def _tombstone(self, uid):
+        doc = self._doc_by_uid.pop(uid, None)
+        if doc is not None:
+            self._alive[doc] = 0
+            self._dead += 1
+
+    def search(self, query, limit=FUZZY_SEARCH_MAX_RESULTS, threshold=FUZZY_SEARCH_THRESHOLD, category=None):
+        """
+        Return [(uid, score)] ranked by similarity, best first.
+
+        The score is the share of query trigrams found in the component, so
+        typos and reordered words still match; ties prefer the component whose
+        own text is closest to the query.
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        with self._lock:
+            docs = len(self._uids)
+            hits = [self._postings[g] for g in grams if g in self._postings]
+            hits.extend(np.frombuffer(self._pending[g], dtype=np.uint32) for g in grams if g in self._pending)
+            if not hits or not docs:
+                return []
+
+            shared = np.bincount(np.concatenate(hits), minlength=docs)
+            shared[np.frombuffer(self._alive, dtype=np.int8) == 0] = 0
+            if category is not None:
+                shared[np.frombuffer(self._categories, dtype=np.int8) != _CATEGORY_CODES[category]] = 0
+
+            score = shared / len(grams)
+            candidates = np.flatnonzero(score >= threshold)
+            if not len(candidates):
+                return []
+
+            sizes = np.frombuffer(self._sizes, dtype=np.uint32)[candidates]
+            jaccard = shared[candidates] / (len(grams) + sizes - shared[candidates])
+            order = np.lexsort((-jaccard, -score[candidates]))[:limit]
+            return [(self._uids[candidates[i]], float(score[candidates[i]])) for i in order]
+
+
+# Process-wide index shared by every session (SQLite and other non-Postgres databases)
+trigram_index = TrigramIndex()
+db.add_write_listener(trigram_index)
+_build_lock = threading.Lock()
+_BUILD_ATTEMPTS = 3  # Builds raced by writes before serving the last one and rebuilding on next use
+
+
+def fuzzy_search_components(search, category=None, type_filter=None, change_type=None, limit=50, offset=0):
+    """
+    Similarity-ranked component search tolerant of typos and word order.
+    Takes the same filters as `list_components`.
+
+    Uses pg_trgm on PostgreSQL and the in-process trigram index elsewhere.
+
+    Returns:
+        Tuple of (components for the requested page, total matches)
+    """
+    if db.has_pg_trgm:
+        ranked = db.search_components_trigram(search, category=category, limit=FUZZY_SEARCH_MAX_RESULTS,
+                                              threshold=FUZZY_SEARCH_THRESHOLD)
+    else:
+        if not trigram_index.is_built:
+            with _build_lock:
+                for _ in range(_BUILD_ATTEMPTS):
+                    if trigram_index.is_built:
+                        break
+                    generation = trigram_index.generation
+                    trigram_index.build(db.get_component_fuzzy_rows(), generation)
+        ranked = trigram_index.search(search, category=category)
+
+    uids = [uid for uid, _ in ranked]
+    if not type_filter and not change_type:
+        # Only the visible page needs loading
+        return db.get_components_by_uids(uids[offset:offset + limit]), len(uids)
+    components = db.get_components_by_uids(uids, type_filter=type_filter, change_type=change_type)
+    return components[offset:offset + limit], len(components)
@@ -0,0 +1,123 @@
+"""Declarative registry of low-code editor URL routes used to classify imports"""
+
+import json
+import re
+import threading
+from src.config import URL_PATTERNS_PATH
+from src.models.component import Category
+
+_FRAGMENT = '/#/'
+
+
+class UrlRoute:
+    """One configured route: where it lives, what it captures and its default type"""
+
+    def __init__(self, config):
+        try:
+            self.name = config['name']
+            self.prefix = tuple(p for p in config['prefix'].strip('/').split('/') if p)
+            self.category = Category[config['category']]
+            self.default_type = config['default_type']
+            self.capture = re.compile(config['capture'])
+        except KeyError as e:
+            raise ValueError(f"URL route {config.get('name', config)!r} is missing or has an invalid {e}")
+        except re.error as e:
+            raise ValueError(f"URL route {self.name!r} has an invalid capture pattern: {e}")
+
+        if 'component_id' not in self.capture.groupindex:
+            raise ValueError(f"URL route {self.name!r} must capture a 'component_id' group")
+
+        self.description = config.get('description', '')
+        self.example = config.get('example', '')
+
+        # All type rules compiled into one alternation; the matching group names the type
+        rules = config.get('type_rules', [])
+        self._rule_types = {f"t{i}": rule['type'] for i, rule in enumerate(rules)}
+        self._rules = re.compile(
+            '|'.join(f"(?P<t{i}>{rule['pattern']})" for i, rule in enumerate(rules)),
+            re.IGNORECASE
+        ) if rules else None
+
+    def describe(self, captured):
+        """Fill the description template with the captured URL groups"""
+        return self.description.format(**captured) if '{' in self.description else self.description
+
+    def infer_type(self, name):
+        """Return the type of the first rule matching the component name, else the default"""
+        if self._rules:
+            match = self._rules.search(name)
+            if match:
+                return self._rule_types[match.lastgroup]
+        return self.default_type
+
+
+class UrlPatternRegistry:
+    """
+    Routes compiled into a path-prefix trie.
+
+    Classifying a URL walks the trie one path segment at a time and then runs
+    only the capture pattern of the deepest matching route, so the cost does
+    not grow with the number of configured routes.
+    """
+
+    def __init__(self, routes):
+        self.routes = list(routes)
+        self._depth = max((len(route.prefix) for route in self.routes), default=0)
+        self._trie = {}
+        for route in self.routes:
+            node = self._trie
+            for segment in route.prefix:
+                node = node.setdefault(segment, {})
+            if None in node:
+                raise ValueError(f"URL routes {node[None].name!r} and {route.name!r} share a prefix")
+            node[None] = route
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(UrlRoute(route) for route in config.get('routes', []))
+
+    def match(self, url):
+        """
+        Find the route for `url`.
+
+        Returns:
+            Tuple of (route, capture groups dict), or (None, None)
+        """
+        start = url.find(_FRAGMENT)
+        if start == -1:
+            return None, None
+        path = url[start + len(_FRAGMENT):]
+
+        # Walk the trie, remembering every route passed on the way down
+        candidates = []
+        node = self._trie
+        offset = 0
+        for segment in path.split('/', self._depth)[:-1]:
+            node = node.get(segment)
+            if node is None:
+                break
+            offset += len(segment) + 1
+            if None in node:
+                candidates.append((node[None], offset))
+
+        for route, offset in reversed(candidates):
+            captured = route.capture.match(path, offset)
+            if captured:
+                return route, captured.groupdict()
+        return None, None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_url_registry():
+    """Return the process-wide registry, loading URL_PATTERNS_PATH on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = UrlPatternRegistry.from_file(URL_PATTERNS_PATH)
+    return _registry
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Keep tests off the developer's database: src.utils.database connects on import
+os.environ.setdefault('DB_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='deploytrack_tests_'), 'test.db')}")
@@ -0,0 +1,173 @@
+"""De-duplication of identical audit trail requests, against a local stand-in API"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils import audit_client
+from src.utils.audit_client import (
+    fetch_all_audit_events, fetch_many_audit_trails, post_audit_trail, stream_audit_trail
+)
+from src.utils.singleflight import SingleFlight
+
+CALLERS = 8
+BODY = {'form_data_id': 'form', 'page': 1, 'limit': 10, 'filter': {'record_id': 'rec'}}
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers slowly so concurrent callers overlap, and records every request it receives"""
+    protocol_version = 'HTTP/1.1'
+    received = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.received.append(body)
+        record_id = body['filter']['record_id']
+        throttled = record_id == 'throttled' and len(self.received) <= 2
+        if not throttled:
+            time.sleep(0.3)
+        if record_id == 'missing':
+            # Not retried, so one request reaches the server
+            status, payload = 404, b'{"error": "no such record"}'
+        elif throttled:
+            status, payload = 429, b'{"error": "slow down"}'
+        elif record_id == 'untotalled':
+            # No total and no event ids; the last of 5 events is alone on page 3
+            first = (body['page'] - 1) * body['limit']
+            events = [{'timestamp': 1_700_000_000_000 + i, 'action': 'update'}
+                      for i in range(first, min(first + body['limit'], 5))]
+            status, payload = 200, json.dumps({'data': events}).encode()
+        else:
+            timestamps = ['soon', 1_700_000_000_000, None] if record_id == 'odd' else \
+                [1_700_000_000_000 + i for i in range(3)]
+            events = [{'id': f"{body['form_data_id']}-{i}", 'timestamp': timestamp,
+                       'action': 'update', 'new_data': {'n': i}, 'old_data': {}}
+                      for i, timestamp in enumerate(timestamps)]
+            status, payload = 200, json.dumps({'total': 3, 'data': events}).encode()
+        self.send_response(status)
+        if throttled:
+            self.send_header('Retry-After', '0')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v1/nocode/record/audit_trail"
+    server.shutdown()
+
+
+@pytest.fixture
+def url(server, monkeypatch):
+    """The stand-in's URL, with nothing received yet and an empty result cache"""
+    StandIn.received.clear()
+    flights = SingleFlight(10, share=audit_client._retain_result, release=audit_client._release_result)
+    monkeypatch.setattr(audit_client, 'audit_flights', flights)
+    yield server
+    flights.clear()
+
+
+def concurrently(fn, *args, **kwargs):
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        futures = [executor.submit(fn, *args, **kwargs) for _ in range(CALLERS)]
+        return [future.result() for future in futures]
+
+
+def test_identical_concurrent_requests_are_sent_once(url):
+    results = concurrently(post_audit_trail, url, 'token-a', BODY)
+    assert len(StandIn.received) == 1
+    assert all(status == 200 and len(data['data']) == 3 for status, data in results)
+
+
+def test_repeat_within_ttl_is_served_from_cache(url):
+    post_audit_trail(url, 'token-a', BODY)
+    timings = []
+    # Same body with its keys in another order
+    post_audit_trail(url, 'token-a', dict(reversed(list(BODY.items()))), timings=timings)
+    assert len(StandIn.received) == 1
+    assert timings[0].source == 'cache'
+
+
+def test_other_token_body_or_fresh_is_sent(url):
+    post_audit_trail(url, 'token-a', BODY)
+    post_audit_trail(url, 'token-b', BODY)
+    post_audit_trail(url, 'token-a', {**BODY, 'page': 2})
+    post_audit_trail(url, 'token-a', BODY, fresh=True)
+    assert len(StandIn.received) == 4
+
+
+def test_failures_are_shared_but_not_cached(url):
+    missing = {**BODY, 'filter': {'record_id': 'missing'}}
+    results = concurrently(post_audit_trail, url, 'token-a', missing)
+    assert len(StandIn.received) == 1
+    assert all(status == 404 for status, _ in results)
+    post_audit_trail(url, 'token-a', missing)
+    assert len(StandIn.received) == 2
+
+
+def test_streamed_store_is_shared_until_every_holder_closes_it(url):
+    results = concurrently(stream_audit_trail, url, 'token-a', BODY)
+    store = results[0][1]['data']
+    assert len(StandIn.received) == 1
+    assert all(data['data'] is store for _, data in results)
+    assert len(store) == 3
+
+    for _ in results:
+        store.close()
+    # Still held by the result cache
+    assert os.path.exists(store.path)
+    audit_client.audit_flights.clear()
+    assert not os.path.exists(store.path)
+
+
+def test_retries_take_a_rate_limit_token_each(url, monkeypatch):
+    acquired = []
+    gate = audit_client._get_gate(url)
+    monkeypatch.setattr(gate.limiter, 'acquire', lambda: acquired.append(time.monotonic()))
+    timings = []
+    status, _ = post_audit_trail(url, 'token-a', {**BODY, 'filter': {'record_id': 'throttled'}}, timings=timings)
+    assert status == 200
+    assert len(StandIn.received) == len(acquired) == 3
+    assert timings[0].retries == 2
+
+
+def test_batch_collects_any_record_failure(url, monkeypatch):
+    def merge_events(pages, descending=True):
+        raise TypeError("cannot order these events")
+
+    monkeypatch.setattr(audit_client, 'merge_events', merge_events)
+    result = fetch_many_audit_trails(url, 'token-a', [('form', 'rec'), ('form', 'odd')])
+    assert result['records'] == 0
+    assert [failure['error'] for failure in result['failures']] == ["cannot order these events"] * 2
+
+
+def test_batch_orders_events_with_odd_timestamps(url):
+    result = fetch_many_audit_trails(url, 'token-a', [('form', 'rec'), ('form', 'odd')])
+    assert not result['failures']
+    assert len(result['data']) == 6
+
+
+def test_unknown_total_pages_until_a_short_page(url):
+    body = {**BODY, 'filter': {'record_id': 'untotalled'}}
+    result = fetch_all_audit_events(url, 'token-a', body, limit=2, workers=2)
+    assert result['pages'] == 3
+    assert len(result['data']) == 5
+
+
+@pytest.mark.parametrize('limit', [0, -5, 2.5, '10', True])
+def test_fetch_all_rejects_a_bad_limit(url, limit):
+    with pytest.raises(ValueError):
+        fetch_all_audit_events(url, 'token-a', BODY, limit=limit)
+    assert not StandIn.received
@@ -0,0 +1,56 @@
+"""Tabular views and field history of audit trail events"""
+
+import time
+from datetime import datetime
+
+import pytest
+
+from src.utils import audit_events
+from src.utils.audit_events import RecordHistory, events_to_frame
+
+
+def event(timestamp, new, old=None, event_id=None):
+    return {'id': event_id, 'timestamp': timestamp, 'action': 'update', 'new_data': new, 'old_data': old or {}}
+
+
+def test_value_at_and_state_at():
+    history = RecordHistory([
+        event(3000, {'status': 'done'}, {'status': 'open'}),
+        event(1000, {'status': 'open', 'owner': 'a'}),
+        event(2000, {'owner': 'b'}, {'owner': 'a'}),
+    ], checkpoint_every=2)
+    assert [v.value for v in history.field_history('status')] == ['open', 'done']
+    assert history.value_at('status', 999) is None
+    assert history.value_at('status', 2999).value == 'open'
+    assert history.value_at('owner', 2000).value == 'b'
+    assert history.state_at(2500) == {'status': 'open', 'owner': 'b'}
+    assert history.state_at(5000) == {'status': 'done', 'owner': 'b'}
+
+
+def test_string_and_missing_timestamps_are_ordered_numerically():
+    history = RecordHistory([
+        event('2000', {'status': 'second'}),
+        event(None, {'status': 'unknown time'}),
+        event(1000, {'status': 'first'}),
+        event('soon', {'status': 'unparseable'}),
+    ])
+    assert history.timestamps == [0, 0, 1000, 2000]
+    assert history.value_at('status', 1500).value == 'first'
+    assert history.value_at('status', 2000).value == 'second'
+
+
+@pytest.mark.skipif(not hasattr(time, 'tzset'), reason="needs time.tzset")
+@pytest.mark.parametrize('zone', ['America/New_York', 'EST+5EDT,M3.2.0/2,M11.1.0/2'])
+def test_times_follow_dst_like_fromtimestamp(monkeypatch, zone):
+    monkeypatch.setenv('TZ', zone)
+    time.tzset()
+    audit_events._local_timezone.cache_clear()
+    try:
+        # Either side of the March and November changes
+        timestamps = [1710054000000, 1710100000000, 1730600000000, 1730700000000]
+        frame = events_to_frame([{'id': i, 'timestamp': t} for i, t in enumerate(timestamps)])
+        assert [t.to_pydatetime() for t in frame['time']] == [datetime.fromtimestamp(t / 1000) for t in timestamps]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+        audit_events._local_timezone.cache_clear()
@@ -0,0 +1,51 @@
+"""DM index reloads that survive a broken index file"""
+
+import json
+import os
+
+import pytest
+
+from src.utils.dm_index import DmIndex, build_binary_index
+
+
+@pytest.fixture
+def index_files(tmp_path):
+    json_path = tmp_path / 'indexed-data-managers.json'
+    json_path.write_text(json.dumps({f'fd{i}': f'tg{i % 3}' for i in range(100)}))
+    idx_path = build_binary_index(str(json_path))
+    with open(idx_path, 'rb') as f:
+        return str(json_path), idx_path, f.read()
+
+
+def bump_mtime(path, step):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + step))
+
+
+@pytest.mark.parametrize('broken', [b'', b'DMIX', 'records', 'magic'])
+def test_replaced_with_broken_file_keeps_last_mapping(index_files, broken):
+    json_path, idx_path, good = index_files
+    index = DmIndex(json_path, check_seconds=0)
+    assert index.get('fd5') == 'tg2'
+
+    data = {'records': good[:40], 'magic': b'XXXX' + good[4:]}.get(broken, broken)
+    with open(idx_path + '.new', 'wb') as f:
+        f.write(data)
+    os.replace(idx_path + '.new', idx_path)
+    bump_mtime(idx_path, 1_000_000)
+
+    assert index.get('fd5') == 'tg2'
+    assert index.stats()['error'].startswith('Could not load')
+
+
+def test_rewritten_in_place_is_dropped(index_files):
+    json_path, idx_path, good = index_files
+    index = DmIndex(json_path, check_seconds=0)
+    assert index.get('fd5') == 'tg2'
+
+    with open(idx_path, 'wb') as f:
+        f.write(good[:40])
+    bump_mtime(idx_path, 1_000_000)
+
+    assert index.get('fd5') is None
+    assert len(index) == 0
@@ -0,0 +1,16 @@
+"""Streaming scan of raw JSON exports"""
+
+import pytest
+
+from src.utils.extract_form_data_id import scan_references
+
+CHUNK_SIZE = 100_000
+# First chunk's cut: keys starting here are left for the next buffer
+CUT = CHUNK_SIZE - 64 * 1024
+
+
+@pytest.mark.parametrize('offset', range(CUT - 2, CUT + 3))
+def test_key_at_chunk_boundary_is_reported_once(offset):
+    prefix = '{"pad": "' + 'x' * (offset - 12) + '", '
+    text = prefix + '"form_data_id": "X1", "more": "' + 'y' * 2 * CHUNK_SIZE + '"}'
+    assert list(scan_references(text, chunk_size=CHUNK_SIZE)) == [('form_data_id', 'X1', offset)]
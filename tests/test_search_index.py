@@ -0,0 +1,41 @@
+"""Prefix index kept current by write notifications"""
+
+from types import SimpleNamespace
+
+from src.models.component import Category
+from src.utils import search_index
+from src.utils.search_index import PrefixIndex
+
+
+def component(uid, name):
+    return SimpleNamespace(uid=uid, name=name, component_id=uid, category=Category.VP)
+
+
+def test_write_during_build_is_not_lost(monkeypatch):
+    index = PrefixIndex()
+    rows = [('c1', 'Alpha', 'c1', Category.VP)]
+    reads = []
+
+    def get_component_search_keys():
+        reads.append(len(rows))
+        if len(reads) == 1:
+            # Saved while the first build is reading
+            rows.append(('c2', 'Beta', 'c2', Category.VP))
+            index.component_saved(component('c2', 'Beta'))
+        return list(rows)
+
+    monkeypatch.setattr(search_index, 'name_index', index)
+    monkeypatch.setattr(search_index.db, 'get_component_search_keys', get_component_search_keys)
+
+    assert [s['uid'] for s in search_index.suggest_components('beta')] == ['c2']
+    assert len(reads) == 2
+    assert index.is_built
+
+
+def test_saved_and_deleted_after_build():
+    index = PrefixIndex()
+    assert index.build([('c1', 'Alpha Job', 'c1', Category.VP)], index.generation)
+    index.component_saved(component('c2', 'Alpine'))
+    assert [s['uid'] for s in index.suggest('alp')] == ['c1', 'c2']
+    index.component_deleted('c1')
+    assert [s['uid'] for s in index.suggest('job')] == []
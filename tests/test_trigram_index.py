@@ -0,0 +1,45 @@
+"""Trigram index kept current by write notifications"""
+
+from types import SimpleNamespace
+
+from src.models.component import Category
+from src.utils import trigram_index
+from src.utils.trigram_index import TrigramIndex
+
+
+def component(uid, name):
+    return SimpleNamespace(uid=uid, name=name, description='', category=Category.VP)
+
+
+def test_write_during_build_is_not_lost(monkeypatch):
+    index = TrigramIndex()
+    rows = [('c1', 'Accrual Validation', '', Category.VP)]
+    reads = []
+
+    def get_component_fuzzy_rows():
+        reads.append(len(rows))
+        if len(reads) == 1:
+            # Saved while the first build is reading
+            rows.append(('c2', 'Balance Transfer', '', Category.VP))
+            index.component_saved(component('c2', 'Balance Transfer'))
+        return list(rows)
+
+    monkeypatch.setattr(trigram_index, 'trigram_index', index)
+    monkeypatch.setattr(trigram_index.db, 'has_pg_trgm', False, raising=False)
+    monkeypatch.setattr(trigram_index.db, 'get_component_fuzzy_rows', get_component_fuzzy_rows)
+    monkeypatch.setattr(trigram_index.db, 'get_components_by_uids', lambda uids, **filters: list(uids))
+
+    assert trigram_index.fuzzy_search_components('balance transfr') == (['c2'], 1)
+    assert len(reads) == 2
+    assert index.is_built
+
+
+def test_saved_and_deleted_after_build():
+    index = TrigramIndex()
+    # Enough documents that one write does not trigger a compaction
+    others = [(f'o{i}', f'Other {i}', '', Category.EM) for i in range(10)]
+    assert index.build([('c1', 'Accrual Validation', '', Category.VP)] + others, index.generation)
+    index.component_saved(component('c2', 'Accrual Transfer'))
+    assert {uid for uid, _ in index.search('accrual', threshold=0.5)} == {'c1', 'c2'}
+    index.component_deleted('c1')
+    assert [uid for uid, _ in index.search('validation', threshold=0.5)] == []